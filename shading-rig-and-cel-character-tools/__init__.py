@@ -9,7 +9,7 @@ bl_info = {
 }
 
 import bpy
-from mathutils import Vector
+import time
 import webbrowser
 from bpy.app.handlers import persistent
 import aud
@@ -17,16 +17,25 @@ import aud
 from . import (
     sr_presets,
     addremove_helpers,
+    bake_helpers,
     externaldata_helpers,
     hansens_float_packer,
     json_helpers,
-    math_helpers,
-    node_helpers,
+    lut_helpers,
+    profile_helpers,
+    reduce_helpers,
     setup_helpers,
+    stress_helpers,
     update_helpers,
     visual_helpers,
     cct_silhouette_view_helper,
     sr_edit_mode,
+    sr_frame_cache,
+    sr_link_cache,
+    sr_live_update,
+    sr_packing,
+    sr_profiler,
+    sr_render_update,
     cct_multikey,
     cct_stepped_cloth_interpolation,
 )
@@ -118,8 +127,6 @@ bpy.app.driver_namespace["hansens_float_packer"] = hansens_float_packer
 # seems like this only works immediately after you install
 # an addon. Definitely a bug
 
-_previous_light_transforms = {}
-
 from bpy.props import (
     BoolProperty,
     CollectionProperty,
@@ -162,6 +169,64 @@ class SRCCT_Preferences(AddonPreferences):
         default=True,
     )
 
+    use_frame_cache: BoolProperty(
+        name="Cache Evaluated Frames",
+        description="Remember each effect's result per frame, so looping playback doesn't recompute it",
+        default=True,
+        update=lambda self, context: sr_frame_cache.invalidate_all(),
+    )
+
+    frame_cache_size: IntProperty(
+        name="Frame Cache Size",
+        description="Maximum number of cached effect/frame results (roughly 300 bytes each). Least recently used results are dropped first",
+        default=sr_frame_cache.DEFAULT_CAPACITY,
+        min=0,
+        max=1000000,
+        update=lambda self, context: sr_frame_cache.set_capacity(
+            self.frame_cache_size
+        ),
+    )
+
+    use_deferred_evaluation: BoolProperty(
+        name="Deferred Evaluation",
+        description="Only queue effects while lights move, and blend them on a timer within a time budget. "
+        "Keeps dragging lights responsive with many effects, but Empties may lag a frame behind",
+        default=False,
+    )
+
+    deferred_budget_ms: FloatProperty(
+        name="Budget (ms)",
+        description="How long each timer tick may spend blending effects before leaving the rest for the next tick",
+        default=4.0,
+        min=0.1,
+        max=100.0,
+    )
+
+    deferred_tick_rate: IntProperty(
+        name="Ticks per Second",
+        description="How often queued effects are blended, at most",
+        default=30,
+        min=1,
+        max=120,
+    )
+
+    use_profiling: BoolProperty(
+        name="Profile Shading Rig Handler",
+        description="Record how long each shading rig update takes, per update and per effect",
+        default=False,
+    )
+
+    profile_history_size: IntProperty(
+        name="Profile History",
+        description="How many updates (and timings per effect) to keep. Older ones are dropped",
+        default=sr_profiler.DEFAULT_HISTORY_SIZE,
+        min=10,
+        max=100000,
+        update=lambda self, context: sr_profiler.set_history_size(
+            self.profile_history_size
+        ),
+    )
+
     auto_apply_sr_presets: BoolProperty(
         name="Auto Apply Shading Rig Presets",
         description="Automatically apply presets when changing the preset dropdown",
@@ -194,6 +259,38 @@ class SRCCT_Preferences(AddonPreferences):
             self, "shading_rig_precise_editing", text="Precise Numerical Link Editing"
         )
         row.prop(self, "auto_apply_sr_presets", text="Auto Apply Shading Rig Presets")
+        row = layout.row(align=True)
+        row.prop(self, "use_frame_cache")
+        sub = row.row(align=True)
+        sub.active = self.use_frame_cache
+        sub.prop(self, "frame_cache_size", text="Max Entries")
+        row = layout.row(align=True)
+        row.prop(self, "use_deferred_evaluation")
+        sub = row.row(align=True)
+        sub.active = self.use_deferred_evaluation
+        sub.prop(self, "deferred_budget_ms")
+        sub.prop(self, "deferred_tick_rate")
+        row = layout.row(align=True)
+        row.prop(self, "use_profiling")
+        sub = row.row(align=True)
+        sub.active = self.use_profiling
+        sub.prop(self, "profile_history_size", text="Keep Last")
+        if self.use_profiling:
+            profile_helpers.draw_profile(layout, self.show_icons)
+            row = layout.row(align=True)
+            row.operator(
+                profile_helpers.SR_OT_ExportHandlerProfile.bl_idname,
+                icon="EXPORT" if self.show_icons else "NONE",
+            )
+            row.operator(
+                profile_helpers.SR_OT_ResetHandlerProfile.bl_idname,
+                icon="TRASH" if self.show_icons else "NONE",
+            )
+        row = layout.row(align=True)
+        row.operator(
+            stress_helpers.SR_OT_GenerateStressScene.bl_idname,
+            icon="EXPERIMENTAL" if self.show_icons else "NONE",
+        )
         layout.separator()
         layout.label(text="Render Complete Notification")
         row = layout.row()
@@ -288,8 +385,7 @@ class SR_LinkItem(PropertyGroup):
 
 def get_blend_mode_items(self, _context):
     """Dynamically generate blend mode items for the EnumProperty."""
-    # This list of identifiers MUST match the order in setup_helpers.create_mode_mix_nodes
-    blend_mode_identifiers = ["LIGHTEN", "SUBTRACT", "MULTIPLY", "DARKEN", "ADD"]
+    blend_mode_identifiers = sr_packing.BLEND_MODE_IDENTIFIERS
 
     icon_map = {
         "LIGHTEN": "OUTLINER_OB_LIGHT",
@@ -314,6 +410,8 @@ def get_blend_mode_items(self, _context):
 
 def sr_rig_item_name_update(self, context):
     """When the rig item is renamed, rename the associated empty object."""
+    # Compiled links are keyed by rig name
+    sr_link_cache.invalidate_all()
     if self.empty_object and self.name != self.empty_object.name:
         if self.name:
             self.empty_object.name = self.name
@@ -340,6 +438,7 @@ class SR_RigItem(PropertyGroup):
         description="The Light object that acts as a light source or projection point",
         type=bpy.types.Object,
         poll=lambda self, obj: obj.type == "LIGHT",
+        update=update_helpers.update_light_object,
     )
 
     parent_object: PointerProperty(
@@ -458,6 +557,78 @@ class SR_RigItem(PropertyGroup):
         default=True,
     )
 
+    interpolation_kernel: EnumProperty(
+        name="Interpolation",
+        description="How links are blended together as the light moves",
+        items=[
+            (
+                "INVERSE_DISTANCE",
+                "Inverse Distance",
+                "Weight links by how close they are to the light (default)",
+            ),
+            (
+                "GAUSSIAN",
+                "Gaussian RBF",
+                "Smooth radial basis fit through every link, falling off with Kernel Radius",
+            ),
+            (
+                "THIN_PLATE",
+                "Thin Plate",
+                "Smooth radial basis fit through every link, with no radius to tune",
+            ),
+        ],
+        default="INVERSE_DISTANCE",
+        update=update_helpers.interpolation_update_sync,
+    )
+
+    kernel_radius: FloatProperty(
+        name="Kernel Radius",
+        description="How far each link's influence reaches with the Gaussian kernel",
+        default=0.5,
+        min=0.01,
+        max=10.0,
+        step=5,
+        update=update_helpers.interpolation_update_sync,
+    )
+
+    use_nearest_links: BoolProperty(
+        name="Nearest Links Only",
+        description="Only blend the links nearest to the current light, instead of every link. Faster for rigs with many links (Inverse Distance only)",
+        default=False,
+        update=update_helpers.interpolation_update_sync,
+    )
+
+    nearest_link_count: IntProperty(
+        name="Nearest Links",
+        description="How many of the nearest links to blend",
+        default=4,
+        min=1,
+        max=64,
+        update=update_helpers.interpolation_update_sync,
+    )
+
+    use_lut: BoolProperty(
+        name="Use Baked LUT",
+        description="Look the effect up in its baked light-direction table instead of blending links. Falls back to blending if links or settings change after baking, or the light moves or rolls away from where it was baked",
+        default=False,
+        update=update_helpers.interpolation_update_sync,
+    )
+
+    lut_resolution: IntProperty(
+        name="LUT Samples",
+        description="Number of light directions sampled when baking the LUT",
+        default=2048,
+        min=64,
+        max=16384,
+        update=update_helpers.interpolation_update_sync,
+    )
+
+    is_baked: BoolProperty(
+        name="Baked",
+        description="The Empty's motion has been baked to keyframes, so live updates skip this effect",
+        default=False,
+    )
+
     links: CollectionProperty(type=SR_LinkItem)
 
     correlations_index: IntProperty(name="Selected Link Index", default=0)
@@ -469,9 +640,34 @@ class SR_RigItem(PropertyGroup):
     )
 
 
+def filter_items_by_name(ui_list, data, propname):
+    """
+    Shared filter_items for the effect and link lists: filter by name and
+    sort alphabetically with the list's own filter options. Only the visible
+    rows are ever drawn, so big lists cost the same as small ones.
+    """
+    items = getattr(data, propname)
+    helper = bpy.types.UI_UL_list
+
+    flt_flags = []
+    if ui_list.filter_name:
+        flt_flags = helper.filter_items_by_name(
+            ui_list.filter_name, ui_list.bitflag_filter_item, items, "name"
+        )
+
+    flt_neworder = []
+    if ui_list.use_filter_sort_alpha:
+        flt_neworder = helper.sort_items_by_name(items, "name")
+
+    return flt_flags, flt_neworder
+
+
 class SR_UL_RigList(UIList):
     """UIList for displaying the list of shading rigs."""
 
+    def filter_items(self, context, data, propname):
+        return filter_items_by_name(self, data, propname)
+
     def draw_item(
         self, context, layout, data, item, icon, active_data, active_propname, index
     ):
@@ -486,6 +682,9 @@ class SR_UL_RigList(UIList):
 class SR_UL_LinkList(UIList):
     """UIList for displaying the list of links for a rig."""
 
+    def filter_items(self, context, data, propname):
+        return filter_items_by_name(self, data, propname)
+
     def draw_item(
         self, context, layout, data, item, icon, active_data, active_propname, index
     ):
@@ -542,6 +741,9 @@ class SR_PT_ShadingRigPanel(Panel):
                 row = col.row(align=True)
                 row.label(text="", icon="LIGHT")
                 row.prop(scene, "shading_rig_default_light", text="")
+                row = col.row(align=True)
+                row.label(text="Packing")
+                row.prop(scene, "shading_rig_packing_mode", text="")
 
         layout.separator()
 
@@ -706,6 +908,46 @@ class SR_PT_ShadingRigPanel(Panel):
 
                 col.separator()
 
+                col.prop(active_item, "interpolation_kernel", text="")
+                if active_item.interpolation_kernel == "GAUSSIAN":
+                    col.prop(active_item, "kernel_radius")
+
+                row = col.row(align=True)
+                row.active = active_item.interpolation_kernel == "INVERSE_DISTANCE"
+                row.prop(active_item, "use_nearest_links")
+                sub = row.row(align=True)
+                sub.active = active_item.use_nearest_links
+                sub.prop(active_item, "nearest_link_count", text="")
+
+                row = col.row(align=True)
+                row.prop(active_item, "use_lut")
+                row.prop(active_item, "lut_resolution", text="")
+                row.operator(
+                    lut_helpers.SR_OT_BakeLUT.bl_idname, text="", icon="RENDER_STILL"
+                )
+                if active_item.use_lut:
+                    lut = sr_link_cache.get_baked_lut(active_item)
+                    light_obj = active_item.light_object
+                    if not lut:
+                        col.label(
+                            text="LUT needs baking",
+                            icon="ERROR" if addon_prefs.show_icons else "NONE",
+                        )
+                    elif light_obj and not lut.matches(
+                        light_obj.rotation_euler, light_obj.location
+                    ):
+                        col.label(
+                            text="Light moved or rolled since baking, blending links",
+                            icon="ERROR" if addon_prefs.show_icons else "NONE",
+                        )
+
+                col.operator(
+                    reduce_helpers.SR_OT_ReduceLinks.bl_idname,
+                    icon="MOD_DECIM" if addon_prefs.show_icons else "NONE",
+                )
+
+                col.separator()
+
                 if not active_item.added_to_material:
                     active_object = context.active_object
                     if (
@@ -756,6 +998,37 @@ class SR_PT_ShadingRigPanel(Panel):
                 text="",
             )
 
+            row = layout.row(align=True)
+            row.operator(
+                bake_helpers.SR_OT_BakeToKeyframes.bl_idname,
+                icon="KEYFRAME_HLT" if addon_prefs.show_icons else "NONE",
+            )
+            row.operator(
+                bake_helpers.SR_OT_ClearBakedKeyframes.bl_idname,
+                text="",
+                icon="X",
+            )
+            layout.operator(
+                lut_helpers.SR_OT_ExportLUTs.bl_idname,
+                icon="EXPORT" if addon_prefs.show_icons else "NONE",
+            )
+
+            if addon_prefs.debug_mode:
+                stats = sr_live_update.handler_stats
+                layout.label(
+                    text=f"Last update: {stats['evaluated']} evaluated, "
+                    f"{stats['cached']} cached, {stats['skipped']} skipped, "
+                    f"{stats['written']} written, "
+                    f"{sr_live_update.get_dirty_rig_count()} queued",
+                    icon="INFO" if addon_prefs.show_icons else "NONE",
+                )
+                if addon_prefs.use_frame_cache:
+                    layout.label(
+                        text=f"Frame cache: {sr_frame_cache.get_entry_count()} of "
+                        f"{addon_prefs.frame_cache_size} entries",
+                        icon="INFO" if addon_prefs.show_icons else "NONE",
+                    )
+
             row = layout.row(align=True)
             col = row.column(align=True)
 
@@ -800,123 +1073,86 @@ class SR_PT_ShadingRigPanel(Panel):
 
 @bpy.app.handlers.persistent
 def load_handler(dummy):
+    # Loading a file drops msgbus subscriptions, and every object is new
+    json_helpers.cancel_json_sync()
+    json_helpers.invalidate_scene_properties_cache()
+    json_helpers.subscribe_to_renames()
+    sr_link_cache.invalidate_all()
+    sr_live_update.clear_own_writes()
+    sr_live_update.clear_dirty_rigs()
+    sr_live_update.clear_light_transforms()
+    sr_frame_cache.set_capacity(
+        bpy.context.preferences.addons[
+            "shading-rig-and-cel-character-tools"
+        ].preferences.frame_cache_size
+    )
+    sr_profiler.set_history_size(
+        bpy.context.preferences.addons[
+            "shading-rig-and-cel-character-tools"
+        ].preferences.profile_history_size
+    )
     if bpy.data.objects.get("ShadingRigSceneProperties"):
         json_helpers.sync_json_to_scene(bpy.context.scene)
         # As long as the addon is installed,
         # this should allow appending between files
+    for scene in bpy.data.scenes:
+        if sr_packing.use_push_packing(scene):
+            # Catch objects given an effect's material since it was last pushed
+            sr_packing.push_packed_values(scene.shading_rig_list)
+
+
+@bpy.app.handlers.persistent
+def undo_handler(dummy):
+    # Undo/redo can change links without going through the operators,
+    # and can reallocate the properties object. It also puts the JSON back,
+    # so anything still waiting to sync is out of date
+    json_helpers.cancel_json_sync()
+    json_helpers.invalidate_scene_properties_cache()
+    sr_link_cache.invalidate_all()
+    sr_live_update.clear_own_writes()
+    sr_live_update.clear_dirty_rigs()
+    # Undo puts the effect values back but not the generated image's pixels
+    sr_packing.rebuild_param_textures()
 
 
 @bpy.app.handlers.persistent
 def update_shading_rig_handler(scene, depsgraph):
+    # Renders and background sessions evaluate per frame instead (sr_render_update)
+    if sr_render_update.should_evaluate():
+        return
+
+    # Our own writes tag the depsgraph and land us back here-
+    # don't run inside ourselves, and don't react to our own echo
     addon_prefs = bpy.context.preferences.addons[
         "shading-rig-and-cel-character-tools"
     ].preferences
-    if bpy.types.Scene.is_evaluating_shading_rig:
-        # We're in live mode- update the empties to match the lights
-        """
-        Handles automatic updates for the Shading Rig system.
-        1. Detects renames of Empty objects and syncs shader node names.
-        2. Interpolates Empty transform based on Light rotation.
-        """
-        # realistically, though, something is almost certain
-        # to break if you rename an effect...
-        # I'll probably fix that at some point
-        for rig_item in scene.shading_rig_list:
-            empty_obj = rig_item.empty_object
-            if not empty_obj:
-                if addon_prefs.debug_mode:
-                    print(
-                        f"Shading Rig Debug: Skipping rig '{rig_item.name}' - no Empty object assigned."
-                    )
-                continue
-
-            current_empty_name = empty_obj.name
-            if (
-                rig_item.last_empty_name
-                and rig_item.last_empty_name != current_empty_name
-            ):
-                old_empty_name = rig_item.last_empty_name
-
-                if rig_item.material and rig_item.material.node_tree:
-                    node_tree = rig_item.material.node_tree
-
-                    old_shading_node_name = f"ShadingRigEffect_{old_empty_name}"
-                    new_shading_node_name = f"ShadingRigEffect_{current_empty_name}"
-                    shading_node = node_tree.nodes.get(old_shading_node_name)
-                    if shading_node:
-                        shading_node.name = new_shading_node_name
-                        shading_node.label = new_shading_node_name
-
-                    old_mix_node_name = f"MixRGB_{old_empty_name}"
-                    new_mix_node_name = f"MixRGB_{current_empty_name}"
-                    mix_node = node_tree.nodes.get(old_mix_node_name)
-                    if mix_node:
-                        mix_node.name = new_mix_node_name
-                        mix_node.label = new_mix_node_name
-
-            if rig_item.last_empty_name != current_empty_name:
-                rig_item.last_empty_name = current_empty_name
-
-            # Check for light object and links after rename handling
-            light_obj = rig_item.light_object
-            links = rig_item.links
-            if not light_obj and addon_prefs.debug_mode:
-                print(
-                    f"Shading Rig Debug: Skipping rig '{rig_item.name}' - no Light object assigned."
-                )
-                continue
-            if len(links) == 0 and addon_prefs.debug_mode:
-                continue
-
-            eval_light_obj = light_obj.evaluated_get(depsgraph)
-            if not eval_light_obj and addon_prefs.debug_mode:
-                print(
-                    f"Shading Rig Debug: Skipping rig '{rig_item.name}' - could not get evaluated light object from depsgraph."
-                )
-                continue
-
-            current_light_rotation = eval_light_obj.rotation_euler
-            current_light_position = eval_light_obj.location
-            light_obj_key = light_obj.name_full
-
-            prev_transform = _previous_light_transforms.get(light_obj_key)
-            if prev_transform:
-                # make a 6 digit list combining XYZ rotation and XYZ position
-                rot_pos = list(prev_transform[0]) + list(prev_transform[1])
-                # check the distance between the two 6 digit lists
-                curr_rot_pos = list(current_light_rotation) + list(
-                    current_light_position
-                )
-                # Use a more reasonable threshold for detecting changes (0.001 instead of 1e-5)
-                if all(abs(a - b) < 0.001 for a, b in zip(rot_pos, curr_rot_pos)):
-                    continue
-
-            try:
-                weighted_pos, weighted_scale, weighted_rotation = (
-                    math_helpers.calculateWeightedEmptyPosition(
-                        links, current_light_rotation, current_light_position
-                    )
-                )
+    if sr_live_update.is_handler_running() or sr_live_update.is_own_update(
+        scene, depsgraph
+    ):
+        if addon_prefs.use_profiling:
+            sr_profiler.record_ignored()
+        return
 
-                empty_obj.location = weighted_pos
-                empty_obj.scale = weighted_scale
-                empty_obj.rotation_euler = weighted_rotation
+    start = time.perf_counter()
+    sr_live_update.set_handler_running(True)
+    try:
+        _update_shading_rig(scene, depsgraph, addon_prefs)
+    finally:
+        sr_live_update.set_handler_running(False)
+
+    if addon_prefs.use_profiling:
+        if bpy.types.Scene.is_evaluating_shading_rig:
+            sr_profiler.record_invocation(
+                "LIVE", time.perf_counter() - start, sr_live_update.handler_stats
+            )
+        else:
+            sr_profiler.record_invocation("EDIT", time.perf_counter() - start)
 
-                if light_obj_key not in _previous_light_transforms:
-                    _previous_light_transforms[light_obj_key] = [None, None]
-                _previous_light_transforms[light_obj_key][
-                    0
-                ] = current_light_rotation.copy()
-                _previous_light_transforms[light_obj_key][
-                    1
-                ] = current_light_position.copy()
 
-            except Exception as e:
-                if addon_prefs.debug_mode:
-                    print(
-                        f"Shading Rig Debug: Error in calculateWeightedEmptyPosition: {e}"
-                    )
-                continue
+def _update_shading_rig(scene, depsgraph, addon_prefs):
+    if bpy.types.Scene.is_evaluating_shading_rig:
+        # We're in live mode- update the empties to match the lights
+        sr_live_update.evaluate_live_rigs(scene, depsgraph, addon_prefs)
 
     else:
         # We're in edit mode- we're tweaking light/empty Links
@@ -972,6 +1208,7 @@ def update_shading_rig_handler(scene, depsgraph):
                         )
 
                     # Save current transforms to the PREVIOUS correlation
+                    sr_link_cache.invalidate(rig_item)
                     previous_active_corr.light_position = current_light_pos
                     previous_active_corr.light_rotation = current_light_rot
                     previous_active_corr.empty_position = current_empty_pos
@@ -997,11 +1234,21 @@ def update_shading_rig_handler(scene, depsgraph):
                 if rig_item.light_object:
                     rig_item.light_object.location = active_corr.light_position
                     rig_item.light_object.rotation_euler = active_corr.light_rotation
+                    sr_live_update.mark_own_write(rig_item.light_object)
 
                 if rig_item.empty_object:
-                    rig_item.empty_object.location = active_corr.empty_position
-                    rig_item.empty_object.scale = active_corr.empty_scale
-                    rig_item.empty_object.rotation_euler = active_corr.empty_rotation
+                    sr_live_update.write_results(
+                        [
+                            (
+                                rig_item.empty_object,
+                                (
+                                    active_corr.empty_position,
+                                    active_corr.empty_scale,
+                                    active_corr.empty_rotation,
+                                ),
+                            )
+                        ]
+                    )
 
                 # Update the references
                 bpy.types.Scene.previous_corr = active_corr
@@ -1012,13 +1259,8 @@ def update_shading_rig_handler(scene, depsgraph):
                         f"Shading Rig Debug: Successfully loaded correlation '{active_corr.name}' values to objects"
                     )
 
-                # Sync to JSON after correlation change
-                json_helpers.sync_scene_to_json(scene)
-
-                if addon_prefs.debug_mode:
-                    print(
-                        "Shading Rig Debug: Successfully synced to JSON after correlation change"
-                    )
+                # Sync to JSON once things settle down
+                json_helpers.request_json_sync(scene)
 
             except Exception as e:
                 if addon_prefs.debug_mode:
@@ -1047,6 +1289,7 @@ def update_shading_rig_handler(scene, depsgraph):
                                 f"Detected significant movement, updating correlation '{active_corr.name}'"
                             )
 
+                        sr_link_cache.invalidate(rig_item)
                         active_corr.light_position = (
                             rig_item.light_object.location.copy()
                         )
@@ -1061,8 +1304,9 @@ def update_shading_rig_handler(scene, depsgraph):
                             rig_item.empty_object.rotation_euler.copy()
                         )
 
-                        # Sync to JSON after movement
-                        json_helpers.sync_scene_to_json(scene)
+                        # Dragging fires this every tick- only sync to JSON
+                        # once the drag settles
+                        json_helpers.request_json_sync(scene)
 
                 except Exception as e:
                     if addon_prefs.debug_mode:
@@ -1071,6 +1315,12 @@ def update_shading_rig_handler(scene, depsgraph):
                         )
 
 
+@persistent
+def flush_json_handler(*args):
+    # Don't save or render with edits still waiting to sync
+    json_helpers.flush_json_sync()
+
+
 @persistent
 def render_post(self):
     sound = bpy.context.preferences.addons[
@@ -1113,6 +1363,14 @@ CLASSES = [
     addremove_helpers.SR_OT_Link_Add,
     addremove_helpers.SR_OT_Link_Remove,
     addremove_helpers.SR_OT_RigList_Remove,
+    lut_helpers.SR_OT_BakeLUT,
+    lut_helpers.SR_OT_ExportLUTs,
+    reduce_helpers.SR_OT_ReduceLinks,
+    bake_helpers.SR_OT_BakeToKeyframes,
+    bake_helpers.SR_OT_ClearBakedKeyframes,
+    profile_helpers.SR_OT_ExportHandlerProfile,
+    profile_helpers.SR_OT_ResetHandlerProfile,
+    stress_helpers.SR_OT_GenerateStressScene,
     SR_PT_ShadingRigPanel,
     cct_stepped_cloth_interpolation.OBJECT_OT_interpolate_bake,
     # MultiKey classes
@@ -1194,11 +1452,31 @@ def register():
         default="",
         update=externaldata_helpers.update_character_name,
     )
+    bpy.types.Scene.shading_rig_packing_mode = EnumProperty(
+        name="Packing",
+        description="How each effect's packed values get to the objects using its material",
+        items=sr_packing.PACKING_MODE_ITEMS,
+        default="DRIVERS",
+        update=update_helpers.update_packing_mode,
+    )
 
     bpy.app.handlers.depsgraph_update_post.append(update_shading_rig_handler)
+    sr_render_update.register_handlers()
+    json_helpers.subscribe_to_renames()
+    # Texture mode's parameter images aren't saved, and enabling the addon
+    # in an open file doesn't run load_post
+    sr_packing.start_param_texture_rebuild()
+
+    for handler_list in (bpy.app.handlers.save_pre, bpy.app.handlers.render_pre):
+        if flush_json_handler not in handler_list:
+            handler_list.append(flush_json_handler)
 
     bpy.app.handlers.load_post.append(load_handler)
 
+    for handler_list in (bpy.app.handlers.undo_post, bpy.app.handlers.redo_post):
+        if undo_handler not in handler_list:
+            handler_list.append(undo_handler)
+
     if render_post not in bpy.app.handlers.render_post:
         bpy.app.handlers.render_post.append(render_post)
 
@@ -1215,6 +1493,11 @@ def register():
 
 
 def unregister():
+    # Write any pending edit mode sync while the Scene properties still exist
+    json_helpers.flush_json_sync()
+    json_helpers.stop_json_sync_timer()
+    sr_packing.stop_param_texture_rebuild()
+
     # Remove MultiKey handlers
 
     if cct_multikey.update_frame_handler in bpy.app.handlers.frame_change_pre:
@@ -1227,17 +1510,29 @@ def unregister():
     del bpy.types.Scene.shading_rig_list_index
     del bpy.types.Scene.shading_rig_chararacter_name
     del bpy.types.Scene.shading_rig_show_defaults
+    del bpy.types.Scene.shading_rig_packing_mode
 
     # Remove MultiKey properties
     del bpy.types.Scene.multikey_props
 
     # Remove handlers
+    sr_live_update.stop_deferred_evaluation()
     if update_shading_rig_handler in bpy.app.handlers.depsgraph_update_post:
         bpy.app.handlers.depsgraph_update_post.remove(update_shading_rig_handler)
+    sr_render_update.unregister_handlers()
+    json_helpers.unsubscribe_from_renames()
+
+    for handler_list in (bpy.app.handlers.save_pre, bpy.app.handlers.render_pre):
+        if flush_json_handler in handler_list:
+            handler_list.remove(flush_json_handler)
 
     if load_handler in bpy.app.handlers.load_post:
         bpy.app.handlers.load_post.remove(load_handler)
 
+    for handler_list in (bpy.app.handlers.undo_post, bpy.app.handlers.redo_post):
+        if undo_handler in handler_list:
+            handler_list.remove(undo_handler)
+
     # Remove cache functions
     bpy.types.PHYSICS_PT_cloth_cache.remove(
         cct_stepped_cloth_interpolation.draw_cloth_func
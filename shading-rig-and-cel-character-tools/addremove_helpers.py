@@ -3,7 +3,7 @@ from bpy.types import (
     Operator,
 )
 
-from . import json_helpers
+from . import json_helpers, sr_link_cache, sr_packing
 
 
 class SR_OT_RigList_Add(Operator):
@@ -55,10 +55,7 @@ class SR_OT_RigList_Add(Operator):
 
         json_helpers.set_shading_rig_list_index(len(rig_list) - 1)
 
-        objects_with_material = []
-        for obj in bpy.data.objects:
-            if any(s.material == new_item.material for s in obj.material_slots):
-                objects_with_material.append(obj)
+        objects_with_material = sr_packing.get_objects_with_material(new_item.material)
 
         if addon_prefs.debug_mode:
             print(
@@ -67,51 +64,11 @@ class SR_OT_RigList_Add(Operator):
 
         rig_index = len(rig_list) - 1
 
-        for obj in objects_with_material:
-            packed_prop_name = f"packed:{new_item.name}"
-            obj[packed_prop_name] = [0, 0, 0]
-
-            # Create drivers for each channel (0=red, 1=green, 2=blue)
-            for channel in range(3):
-                fcurve = obj.driver_add(f'["{packed_prop_name}"]', channel)
-                driver = fcurve.driver
-                driver.type = "SCRIPTED"
-
-                # Create input variables as Context Properties
-                var_names = [
-                    "elongation",
-                    "sharpness",
-                    "bulge",
-                    "bend",
-                    "hardness",
-                    "mode",
-                    "clamp",
-                    "rotation"
-                ]
-                var_paths = [
-                    f"shading_rig_list[{rig_index}].elongation",
-                    f"shading_rig_list[{rig_index}].sharpness",
-                    f"shading_rig_list[{rig_index}].bulge",
-                    f"shading_rig_list[{rig_index}].bend",
-                    f"shading_rig_list[{rig_index}].hardness",
-                    f"shading_rig_list[{rig_index}].mode",
-                    f"shading_rig_list[{rig_index}].clamp",
-                    f"shading_rig_list[{rig_index}].rotation",
-                ]
-
-                # Create driver variables
-                for var_name, var_path in zip(var_names, var_paths):
-                    var = driver.variables.new()
-                    var.name = var_name
-                    var.type = "CONTEXT_PROP"
-                    var.targets[0].context_property = "ACTIVE_SCENE"
-                    var.targets[0].data_path = var_path
-
-                # Set the expression to use the input variables
-                driver.expression = (
-                    f"bpy.packing_algorithm("
-                    f"elongation, sharpness, bulge, bend, hardness, mode, clamp, rotation)[{channel}]"
-                )
+        if sr_packing.use_push_packing(scene):
+            sr_packing.push_packed_values([new_item])
+        else:
+            for obj in objects_with_material:
+                sr_packing.add_packing_drivers(obj, f"packed:{new_item.name}", rig_index)
 
         json_helpers.sync_scene_to_json(context.scene)
 
@@ -185,6 +142,7 @@ class SR_OT_Link_Add(Operator):
             new_corr.empty_rotation = empty_obj.rotation_euler
 
             active_rig_item.correlations_index = len(active_rig_item.links) - 1
+            sr_link_cache.invalidate(active_rig_item)
 
             self.report({"INFO"}, f"Stored pose in '{new_corr.name}'.")
 
@@ -230,6 +188,7 @@ class SR_OT_Link_Remove(Operator):
 
         removed_name = active_rig_item.links[index].name
         active_rig_item.links.remove(index)
+        sr_link_cache.invalidate(active_rig_item)
 
         if index > 0:
             active_rig_item.correlations_index = index - 1
@@ -263,6 +222,9 @@ class SR_OT_RigList_Remove(Operator):
             return {"CANCELLED"}
 
         item_to_remove = rig_list[index]
+        sr_packing.remove_scene_value(
+            scene, sr_packing.get_packed_property_name(item_to_remove)
+        )
 
         # TODO: Remove material nodes
 
@@ -270,6 +232,7 @@ class SR_OT_RigList_Remove(Operator):
         if item_to_remove.empty_object:
             objects_to_delete.append(item_to_remove.empty_object)
 
+        sr_link_cache.invalidate(item_to_remove)
         rig_list.remove(index)
 
         if index > 0:
@@ -277,6 +240,10 @@ class SR_OT_RigList_Remove(Operator):
         else:
             json_helpers.set_shading_rig_list_index(0)
 
+        if scene.shading_rig_packing_mode == "TEXTURE":
+            # Every effect after this one moves up a row
+            sr_packing.update_param_texture(scene)
+
         if objects_to_delete:
             bpy.ops.object.select_all(action="DESELECT")
             for obj in objects_to_delete:
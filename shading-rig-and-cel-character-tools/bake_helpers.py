@@ -0,0 +1,258 @@
+import bpy
+import numpy as np
+from bpy.props import IntProperty
+from bpy.types import (
+    Operator,
+)
+
+from . import json_helpers, sr_link_cache
+
+# ---------------------------------------------------------------------------- #
+#                          Bake shading rigs to F-Curves                       #
+# ---------------------------------------------------------------------------- #
+
+# Once baked, an Empty just plays back its keyframes: no handler cost during
+# playback, and farm renders don't depend on the handler firing.
+
+# Every F-Curve a bake writes goes in this action group, so clearing the bake
+# leaves keys the artist set by hand alone
+BAKE_GROUP_NAME = "Shading Rig Bake"
+
+
+def get_bakeable_rigs(scene):
+    """Every effect that has something to evaluate."""
+    return [
+        rig_item
+        for rig_item in scene.shading_rig_list
+        if rig_item.empty_object and rig_item.light_object and len(rig_item.links)
+    ]
+
+
+def can_read_fcurves_directly(light_obj):
+    """
+    The handler only reads the light's own location/rotation_euler,
+    which only keyframes, drivers and NLA can change.
+    With just an action, it's much faster to evaluate the F-Curves ourselves.
+    """
+    anim = light_obj.animation_data
+    if not anim:
+        return True
+    return not anim.drivers and not anim.nla_tracks
+
+
+def sample_light_from_fcurves(light_obj, frames):
+    """Returns (F, 3) rotation and location arrays for a light, from its action."""
+    rotations = np.tile(np.array(light_obj.rotation_euler), (len(frames), 1))
+    locations = np.tile(np.array(light_obj.location), (len(frames), 1))
+
+    anim = light_obj.animation_data
+    if anim and anim.action:
+        for fcurve in anim.action.fcurves:
+            if fcurve.data_path == "rotation_euler":
+                target = rotations
+            elif fcurve.data_path == "location":
+                target = locations
+            else:
+                continue
+            if fcurve.mute or not 0 <= fcurve.array_index < 3:
+                continue
+            target[:, fcurve.array_index] = [fcurve.evaluate(f) for f in frames]
+
+    return rotations, locations
+
+
+def sample_light_transforms(context, lights, frames):
+    """
+    Samples every light's rotation/location over the frame range.
+    Returns {light name: (rotations, locations)}.
+    """
+    samples = {}
+    needs_frame_set = []
+    for light_obj in lights:
+        if can_read_fcurves_directly(light_obj):
+            samples[light_obj.name_full] = sample_light_from_fcurves(light_obj, frames)
+        else:
+            needs_frame_set.append(light_obj)
+
+    if needs_frame_set:
+        # Drivers or NLA- let Blender evaluate the whole scene per frame
+        scene = context.scene
+        original_frame = scene.frame_current
+        buffers = {
+            light_obj.name_full: (
+                np.empty((len(frames), 3)),
+                np.empty((len(frames), 3)),
+            )
+            for light_obj in needs_frame_set
+        }
+        for i, frame in enumerate(frames):
+            scene.frame_set(int(frame))
+            depsgraph = context.evaluated_depsgraph_get()
+            for light_obj in needs_frame_set:
+                eval_light_obj = light_obj.evaluated_get(depsgraph)
+                rotations, locations = buffers[light_obj.name_full]
+                rotations[i] = eval_light_obj.rotation_euler
+                locations[i] = eval_light_obj.location
+        scene.frame_set(original_frame)
+        samples.update(buffers)
+
+    return samples
+
+
+def write_baked_fcurves(empty_obj, frames, channels):
+    """
+    Writes every frame as keyframes in bulk (keyframe_points.add + foreach_set),
+    replacing whatever keys the baked channels had before.
+    """
+    anim = empty_obj.animation_data or empty_obj.animation_data_create()
+    if not anim.action:
+        anim.action = bpy.data.actions.new(f"{empty_obj.name}_ShadingRigBake")
+    action = anim.action
+    group = action.groups.get(BAKE_GROUP_NAME) or action.groups.new(BAKE_GROUP_NAME)
+
+    frames = np.asarray(frames, dtype=np.float32)
+    for data_path, values in channels.items():
+        for index in range(3):
+            fcurve = action.fcurves.find(data_path, index=index)
+            if fcurve is None:
+                fcurve = action.fcurves.new(
+                    data_path, index=index, action_group=BAKE_GROUP_NAME
+                )
+            elif fcurve.group != group:
+                # Its keys are about to be replaced, so it's the bake's now
+                fcurve.group = group
+            fcurve.keyframe_points.clear()
+            fcurve.keyframe_points.add(len(frames))
+
+            co = np.empty(len(frames) * 2, dtype=np.float32)
+            co[0::2] = frames
+            co[1::2] = values[:, index]
+            fcurve.keyframe_points.foreach_set("co", co)
+            fcurve.update()
+
+
+def clear_baked_fcurves(empty_obj):
+    """Removes the F-Curves a bake wrote (the ones in its action group)."""
+    anim = empty_obj.animation_data
+    if not anim or not anim.action:
+        return
+    action = anim.action
+    group = action.groups.get(BAKE_GROUP_NAME)
+    if group is None:
+        return
+    for fcurve in list(action.fcurves):
+        if fcurve.group == group:
+            action.fcurves.remove(fcurve)
+    action.groups.remove(group)
+
+
+class SR_OT_BakeToKeyframes(Operator):
+    """Bake every effect's Empty motion to keyframes over a frame range."""
+
+    bl_idname = "shading_rig.bake_to_keyframes"
+    bl_label = "Bake Effects to Keyframes"
+    bl_description = (
+        "Evaluate every effect over the frame range and keyframe its Empty. "
+        "Baked effects are skipped by the live update"
+    )
+    bl_options = {"REGISTER", "UNDO"}
+
+    frame_start: IntProperty(name="Start Frame", default=1)
+    frame_end: IntProperty(name="End Frame", default=250)
+
+    @classmethod
+    def poll(cls, context):
+        if not get_bakeable_rigs(context.scene):
+            cls.poll_message_set("No effects with a Light, an Empty and links.")
+            return False
+        return True
+
+    def invoke(self, context, event):
+        self.frame_start = context.scene.frame_start
+        self.frame_end = context.scene.frame_end
+        return context.window_manager.invoke_props_dialog(self)
+
+    def execute(self, context):
+        if self.frame_end < self.frame_start:
+            self.report({"ERROR"}, "End frame must be after the start frame.")
+            return {"CANCELLED"}
+
+        scene = context.scene
+        rigs = get_bakeable_rigs(scene)
+        frames = np.arange(self.frame_start, self.frame_end + 1)
+
+        # Mark everything baked up front so the handler doesn't
+        # fight us if we have to step through frames
+        previous_states = [rig_item.is_baked for rig_item in rigs]
+        for rig_item in rigs:
+            rig_item.is_baked = True
+
+        # Rigs whose Empties have been (or are being) written
+        written_rigs = []
+        try:
+            lights = {
+                rig_item.light_object.name_full: rig_item.light_object
+                for rig_item in rigs
+            }
+            light_samples = sample_light_transforms(context, lights.values(), frames)
+
+            for rig_item in rigs:
+                rotations, locations = light_samples[rig_item.light_object.name_full]
+                # LUT rigs are baked from their LUT, as the viewport shows them
+                empty_positions, empty_scales, empty_rotations = (
+                    sr_link_cache.evaluate_rig_samples(
+                        rig_item, rotations, locations, use_lut=True
+                    )
+                )
+                written_rigs.append(rig_item)
+                write_baked_fcurves(
+                    rig_item.empty_object,
+                    frames,
+                    {
+                        "location": empty_positions,
+                        "rotation_euler": empty_rotations,
+                        "scale": empty_scales,
+                    },
+                )
+        except Exception as e:
+            for rig_item, was_baked in zip(rigs, previous_states):
+                rig_item.is_baked = was_baked
+            # Don't leave half a bake behind- those Empties go back to live
+            for rig_item in written_rigs:
+                clear_baked_fcurves(rig_item.empty_object)
+                rig_item.is_baked = False
+            self.report({"ERROR"}, f"Failed to bake effects: {e}")
+            return {"CANCELLED"}
+
+        json_helpers.sync_scene_to_json(scene)
+        self.report(
+            {"INFO"}, f"Baked {len(rigs)} effect(s) over {len(frames)} frames."
+        )
+        return {"FINISHED"}
+
+
+class SR_OT_ClearBakedKeyframes(Operator):
+    """Remove baked keyframes and return every effect to live updates."""
+
+    bl_idname = "shading_rig.clear_baked_keyframes"
+    bl_label = "Clear Baked Keyframes"
+    bl_description = "Remove the baked Empty keyframes and go back to live updates"
+    bl_options = {"REGISTER", "UNDO"}
+
+    @classmethod
+    def poll(cls, context):
+        return any(rig_item.is_baked for rig_item in context.scene.shading_rig_list)
+
+    def execute(self, context):
+        cleared = 0
+        for rig_item in context.scene.shading_rig_list:
+            if not rig_item.is_baked:
+                continue
+            if rig_item.empty_object:
+                clear_baked_fcurves(rig_item.empty_object)
+            rig_item.is_baked = False
+            cleared += 1
+
+        json_helpers.sync_scene_to_json(context.scene)
+        self.report({"INFO"}, f"Cleared baked keyframes from {cleared} effect(s).")
+        return {"FINISHED"}
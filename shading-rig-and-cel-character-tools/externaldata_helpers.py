@@ -46,6 +46,10 @@ class SR_OT_SyncExternalData(Operator):
 
     def execute(self, context):
         try:
+            # Get any pending edits into this character's own object first,
+            # so they're merged rather than written over the combined one
+            json_helpers.flush_json_sync()
+
             # Create the combined properties object
             combined_obj = json_helpers.create_combined_properties_object()
 
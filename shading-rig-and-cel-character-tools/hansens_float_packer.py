@@ -4,6 +4,8 @@
 
 import math
 
+import numpy as np
+
 
 def clamp(minimum, x, maximum):
     return max(minimum, min(x, maximum))
@@ -86,4 +88,126 @@ def packing_algorithm(elongation, sharpness, bulge, bend, hardness, mode, clamp_
         + rot_ones
     )
 
-    return (red, green, blue)
\ No newline at end of file
+    return (red, green, blue)
+
+
+# ---------------------------------------------------------------------------- #
+#                              Packing in bulk                                 #
+# ---------------------------------------------------------------------------- #
+
+# The same packing for many effects at once, with NumPy. Every argument can be
+# a scalar or an array (they're broadcast together), and the digits come out
+# exactly as packing_algorithm's.
+
+# The order the effect node's inputs come out of unpack_many
+UNPACKED_FIELDS = (
+    "elongation",
+    "sharpness",
+    "rotation",
+    "bend",
+    "bulge",
+    "hardness",
+    "mode",
+    "clamp",
+)
+
+
+def pack_many(elongation, sharpness, bulge, bend, hardness, mode, clamp_val, rotation):
+    """
+    Vectorized packing_algorithm. Returns an (N, 3) float64 array of red,
+    green, blue (whole numbers, so they survive float32 attributes).
+    """
+    elongation, sharpness, bulge, bend, hardness, mode, clamp_val, rotation = (
+        np.broadcast_arrays(
+            *(
+                np.atleast_1d(np.asarray(value, dtype=np.float64))
+                for value in (
+                    elongation,
+                    sharpness,
+                    bulge,
+                    bend,
+                    hardness,
+                    mode,
+                    clamp_val,
+                    rotation,
+                )
+            )
+        )
+    )
+
+    elongation = np.floor(np.clip(elongation, 0.0, 0.999) * 1000)
+    sharpness = np.floor(np.clip(sharpness, 0.0, 0.999) * 1000)
+    hardness = np.floor(np.clip(hardness, 0.0, 0.999) * 1000)
+    bend = np.floor(np.clip(bend, -0.999, 0.999) * 1000)
+    bulge = np.floor(np.clip(bulge, -0.999, 0.999) * 1000)
+    bend_sign = (bend >= 0).astype(np.float64)
+    bulge_sign = (bulge >= 0).astype(np.float64)
+    # packing_algorithm checks == True, so only exactly 1 counts
+    clamp_val = (clamp_val == 1).astype(np.float64)
+    mode = np.trunc(np.clip(mode, 0, 4))
+    rotation = np.trunc(np.clip(rotation, 0, 99))
+
+    packed = np.empty((len(elongation), 3), dtype=np.float64)
+    packed[:, 0] = elongation * 10000 + np.floor(rotation / 10) * 1000 + sharpness
+    packed[:, 1] = np.abs(bend) * 10000 + bend_sign * 1000 + hardness
+    packed[:, 2] = (
+        np.abs(bulge) * 10000
+        + bulge_sign * 1000
+        + mode * 100
+        + clamp_val * 10
+        + rotation % 10
+    )
+    return packed
+
+
+def unpack_many(packed, dtype=np.float32):
+    """
+    Python copy of the decode node_helpers.unpack_nodes builds, for an (N, 3)
+    packed array. Every Math node is repeated in dtype (float32 by default,
+    like the shader), quirks included: sharpness is divided by 900, rotation
+    comes out as 0-9.9, and mode is what goes into the mode mix nodes (before
+    they round and clamp it).
+    Returns {field: (N,) array}, see UNPACKED_FIELDS.
+    """
+    packed = np.asarray(packed, dtype=dtype).reshape(-1, 3)
+    red, green, blue = packed[:, 0], packed[:, 1], packed[:, 2]
+
+    def divide(a, b):
+        return np.divide(a, dtype(b), dtype=dtype)
+
+    def modulo(a, b):
+        # The Math node's Modulo truncates (fmod), it isn't Python's %
+        return np.fmod(a, dtype(b), dtype=dtype)
+
+    def apply_sign(value, sign):
+        return value * (sign * dtype(2.0) - dtype(1.0))
+
+    # RED CHANNEL: EEETSSS
+    elongation = divide(np.floor(divide(red, 10000.0)), 1000.0)
+    rot_tens = np.floor(modulo(divide(red, 1000.0), 10.0))
+    sharpness = divide(modulo(red, 1000.0), 900.0)
+
+    # GREEN CHANNEL: BBBSHHH
+    bend = divide(np.floor(divide(green, 10000.0)), 1000.0)
+    bend_sign = np.floor(divide(modulo(green, 10000.0), 1000.0))
+    hardness = divide(modulo(green, 1000.0), 1000.0)
+
+    # BLUE CHANNEL: UUUSMCR
+    bulge = divide(np.floor(divide(blue, 10000.0)), 1000.0)
+    bulge_sign = np.floor(divide(modulo(blue, 10000.0), 1000.0))
+    mode = np.floor(divide(modulo(blue, 1000.0), 100.0))
+    clamp_val = np.floor(divide(modulo(blue, 100.0), 10.0))
+    rot_ones = modulo(blue, 10.0)
+
+    rotation = divide(rot_tens * dtype(10.0) + rot_ones, 10.0)
+
+    return {
+        "elongation": elongation,
+        "sharpness": sharpness,
+        "rotation": rotation,
+        "bend": apply_sign(bend, bend_sign),
+        "bulge": apply_sign(bulge, bulge_sign),
+        "hardness": hardness,
+        "mode": mode,
+        "clamp": clamp_val,
+    }
@@ -1,7 +1,10 @@
 import json
+import time
 
 import bpy
 
+from . import sr_link_cache
+
 # ---------------------------------------------------------------------------- #
 #                                 JSON helpers                                 #
 # ---------------------------------------------------------------------------- #
@@ -33,6 +36,13 @@ def serialize_rig_list_to_json(rig_list):
             "mode": rig.mode,
             "clamp": rig.clamp,
             "rotation": rig.rotation,
+            "interpolation_kernel": rig.interpolation_kernel,
+            "kernel_radius": rig.kernel_radius,
+            "use_nearest_links": rig.use_nearest_links,
+            "nearest_link_count": rig.nearest_link_count,
+            "use_lut": rig.use_lut,
+            "lut_resolution": rig.lut_resolution,
+            "is_baked": rig.is_baked,
             "added_to_material": rig.added_to_material,
             "correlations_index": rig.correlations_index,
             "empty_object_name": empty_object_name,
@@ -71,15 +81,82 @@ def sync_scene_to_json(scene):
     """Save scene rig list to JSON on empty object."""
     json_data = serialize_rig_list_to_json(scene.shading_rig_list)
     set_shading_rig_list_json(json_data)
+    if _pending_sync_scene == scene.name:
+        # That was everything the pending sync would have written
+        cancel_json_sync()
+
+
+# -------------------------- Debounced edit mode sync -------------------------- #
+# Dragging a light or empty in edit mode changes the active link on every
+# tick. Serializing every rig and link each time made editing big rigs
+# sluggish, so edit mode only asks for a sync; it happens once nothing
+# has asked for JSON_SYNC_DELAY seconds, or right away before saving,
+# rendering, leaving edit mode or reading the JSON back.
+
+JSON_SYNC_DELAY = 0.5
+
+_pending_sync_scene = None
+_last_sync_request = 0.0
+
+
+def request_json_sync(scene):
+    """Marks the scene's rig list as needing a sync, and (re)starts the wait."""
+    global _pending_sync_scene, _last_sync_request
+    if _pending_sync_scene is not None and _pending_sync_scene != scene.name:
+        # Don't lose another scene's edits
+        flush_json_sync()
+    _pending_sync_scene = scene.name
+    _last_sync_request = time.monotonic()
+    if not bpy.app.timers.is_registered(_json_sync_timer):
+        bpy.app.timers.register(_json_sync_timer, first_interval=JSON_SYNC_DELAY)
+
+
+def flush_json_sync():
+    """Writes a pending sync now."""
+    scene_name = _pending_sync_scene
+    cancel_json_sync()
+    if scene_name is None:
+        return
+    scene = bpy.data.scenes.get(scene_name)
+    if scene and get_scene_properties_object():
+        sync_scene_to_json(scene)
+
+
+def cancel_json_sync():
+    """Forgets a pending sync without writing it."""
+    global _pending_sync_scene
+    # A timer that's still registered finds nothing to do and stops itself
+    _pending_sync_scene = None
+
+
+def stop_json_sync_timer():
+    cancel_json_sync()
+    if bpy.app.timers.is_registered(_json_sync_timer):
+        bpy.app.timers.unregister(_json_sync_timer)
+
+
+def _json_sync_timer():
+    if _pending_sync_scene is None:
+        return None
+    waited = time.monotonic() - _last_sync_request
+    if waited < JSON_SYNC_DELAY:
+        # Still being dragged, check back later
+        return JSON_SYNC_DELAY - waited
+    flush_json_sync()
+    return None
 
 
 def sync_json_to_scene(scene):
     """Load rig list from JSON into scene collection."""
+    # The scene is about to be replaced, so a pending sync is out of date
+    # (callers that want it kept flush first)
+    cancel_json_sync()
     json_data = get_shading_rig_list_json()
     rig_data_list = deserialize_rig_list_from_json(json_data)
 
     # Clear existing
     scene.shading_rig_list.clear()
+    sr_link_cache.invalidate_all()
 
     # Rebuild from JSON
     for rig_data in rig_data_list:
@@ -96,6 +173,15 @@ def sync_json_to_scene(scene):
         new_rig.mode = rig_data["mode"]
         new_rig.clamp = rig_data["clamp"]
         new_rig.rotation = rig_data["rotation"]
+        new_rig.interpolation_kernel = rig_data.get(
+            "interpolation_kernel", "INVERSE_DISTANCE"
+        )
+        new_rig.kernel_radius = rig_data.get("kernel_radius", 0.5)
+        new_rig.use_nearest_links = rig_data.get("use_nearest_links", False)
+        new_rig.nearest_link_count = rig_data.get("nearest_link_count", 4)
+        new_rig.use_lut = rig_data.get("use_lut", False)
+        new_rig.lut_resolution = rig_data.get("lut_resolution", 2048)
+        new_rig.is_baked = rig_data.get("is_baked", False)
         new_rig.added_to_material = rig_data["added_to_material"]
         new_rig.correlations_index = rig_data["correlations_index"]
 
@@ -187,20 +273,79 @@ def use_combined_properties():
 # ---------------------------------------------------------------------------- #
 
 
-def get_scene_properties_object():
-    """Get the ShadingRigSceneProperties empty object."""
+# The resolved object is kept until something could have changed which
+# object it should be: another scene or character name, objects added or
+# deleted (the object count changes), any object renamed (msgbus), undo or
+# loading a file. A None result is cached the same way. Operator polls
+# while the sidebar redraws hit this too.
+_props_cache_key = None
+_props_cache_obj = None
 
+# Owner for the msgbus rename subscription
+_msgbus_owner = object()
+
+
+def invalidate_scene_properties_cache(*args):
+    global _props_cache_key, _props_cache_obj
+    _props_cache_key = None
+    _props_cache_obj = None
+
+
+def subscribe_to_renames():
+    """Drops the cached object when any object is renamed. Needs redoing after file load."""
+    bpy.msgbus.clear_by_owner(_msgbus_owner)
+    bpy.msgbus.subscribe_rna(
+        key=(bpy.types.Object, "name"),
+        owner=_msgbus_owner,
+        args=(),
+        notify=invalidate_scene_properties_cache,
+    )
+
+
+def unsubscribe_from_renames():
+    bpy.msgbus.clear_by_owner(_msgbus_owner)
+    invalidate_scene_properties_cache()
+
+
+def _resolve_scene_properties_object(character_name):
     if use_combined_properties():
         combined_obj = bpy.data.objects.get("ShadingRigSceneProperties_Combined")
         if combined_obj:
             return combined_obj
 
-    props_obj = bpy.data.objects.get(
-        f"ShadingRigSceneProperties_{bpy.context.scene.shading_rig_chararacter_name}"
-    )
+    props_obj = bpy.data.objects.get(f"ShadingRigSceneProperties_{character_name}")
     return props_obj
 
 
+def _is_cached_object_valid(character_name):
+    if _props_cache_obj is None:
+        return True
+    try:
+        # msgbus notifications arrive a little late, so check the name too
+        return _props_cache_obj.name in (
+            "ShadingRigSceneProperties_Combined",
+            f"ShadingRigSceneProperties_{character_name}",
+        )
+    except ReferenceError:
+        # Deleted while something else was added
+        return False
+
+
+def get_scene_properties_object():
+    """Get the ShadingRigSceneProperties empty object."""
+    global _props_cache_key, _props_cache_obj
+
+    scene = bpy.context.scene
+    character_name = scene.shading_rig_chararacter_name
+    cache_key = (scene.session_uid, character_name, len(bpy.data.objects))
+    if cache_key == _props_cache_key and _is_cached_object_valid(character_name):
+        return _props_cache_obj
+
+    _props_cache_obj = _resolve_scene_properties_object(character_name)
+    _props_cache_key = cache_key
+    return _props_cache_obj
+
+
 def get_shading_rig_list_index():
     props_obj = get_scene_properties_object()
     return props_obj.get("shading_rig_list_index", 0)
@@ -0,0 +1,333 @@
+import json
+import os
+
+import bpy
+import numpy as np
+from bpy.props import EnumProperty, IntProperty, StringProperty
+from bpy.types import (
+    Operator,
+)
+from mathutils import Vector
+
+from . import json_helpers, math_helpers, sr_link_cache
+
+# ---------------------------------------------------------------------------- #
+#                        Light-direction lookup tables                         #
+# ---------------------------------------------------------------------------- #
+
+# For rigs whose lights only rotate, the whole link blend can be sampled
+# ahead of time over every light direction. Evaluating is then a lookup
+# that costs the same no matter how many links there are.
+
+
+def get_sample_rotations(directions):
+    """
+    Light rotations (as XYZ Eulers) pointing a light down each direction.
+    -Z tracks the direction and Y stays up, which matches the usual
+    tilted-then-spun key light.
+    """
+    return np.array(
+        [
+            Vector(direction).to_track_quat("-Z", "Y").to_euler()
+            for direction in directions
+        ]
+    )
+
+
+def sample_rig_for_directions(rig_item, directions, light_position=None):
+    """
+    Evaluates a rig with its light pointed down each of an (N, 3) array of
+    directions, held at light_position (its current location by default).
+    Returns (N, 9) rows of empty position, scale and rotation.
+    """
+    if light_position is None:
+        light_position = rig_item.light_object.location
+
+    rotations = get_sample_rotations(directions)
+    positions = np.tile(
+        np.asarray(light_position, dtype=np.float64), (len(directions), 1)
+    )
+
+    empty_positions, empty_scales, empty_rotations = (
+        sr_link_cache.evaluate_rig_samples(rig_item, rotations, positions)
+    )
+    return np.hstack((empty_positions, empty_scales, empty_rotations))
+
+
+def sample_rig_over_directions(rig_item, sample_count, light_position=None):
+    """
+    Evaluates a rig over a Fibonacci lattice of light directions.
+    Returns (directions, values), values being (sample_count, 9) rows of
+    empty position, scale and rotation.
+    """
+    directions = math_helpers.fibonacciSphere(sample_count)
+    return directions, sample_rig_for_directions(rig_item, directions, light_position)
+
+
+class SR_OT_BakeLUT(Operator):
+    """Bake the active effect into a light-direction lookup table."""
+
+    bl_idname = "shading_rig.bake_lut"
+    bl_label = "Bake LUT"
+    bl_description = (
+        "Sample the active effect over every light direction, so it's looked up "
+        "instead of blended. Only for lights that rotate without moving"
+    )
+    bl_options = {"REGISTER", "UNDO"}
+
+    @classmethod
+    def poll(cls, context):
+        scene = context.scene
+        if not (
+            json_helpers.get_shading_rig_list_index() >= 0
+            and len(scene.shading_rig_list) > 0
+        ):
+            cls.poll_message_set("No effects in the list.")
+            return False
+
+        active_item = scene.shading_rig_list[json_helpers.get_shading_rig_list_index()]
+        if not active_item.light_object or not active_item.empty_object:
+            cls.poll_message_set("Active effect needs a Light and an Empty Object.")
+            return False
+
+        if len(active_item.links) == 0:
+            cls.poll_message_set("Active effect has no links to bake.")
+            return False
+
+        return True
+
+    def execute(self, context):
+        scene = context.scene
+        rig_item = scene.shading_rig_list[json_helpers.get_shading_rig_list_index()]
+
+        try:
+            light_position = rig_item.light_object.location.copy()
+            _, values = sample_rig_over_directions(
+                rig_item, rig_item.lut_resolution, light_position
+            )
+            sr_link_cache.store_baked_lut(rig_item, values, light_position)
+        except Exception as e:
+            self.report({"ERROR"}, f"Failed to bake LUT: {e}")
+            return {"CANCELLED"}
+
+        self.report(
+            {"INFO"},
+            f"Baked {rig_item.lut_resolution} light directions for '{rig_item.name}'.",
+        )
+        return {"FINISHED"}
+
+
+# ---------------------------------------------------------------------------- #
+#                        Lookup textures for game engines                      #
+# ---------------------------------------------------------------------------- #
+
+# The same sampling, laid out as an octahedral map so an engine can replace
+# the whole link blend with one texture fetch: encode the light direction
+# to octahedral UVs, sample, and read the Empty's transform back.
+
+LUT_MANIFEST_NAME = "shading_rig_luts.json"
+
+LUT_CHANNELS = [
+    "empty_position.x",
+    "empty_position.y",
+    "empty_position.z",
+    "empty_scale.x",
+    "empty_scale.y",
+    "empty_scale.z",
+    "empty_rotation.x",
+    "empty_rotation.y",
+    "empty_rotation.z",
+]
+
+
+def sample_rig_octahedral(rig_item, resolution):
+    """
+    Samples a rig over a resolution x resolution octahedral map of light
+    directions. Returns a (resolution, resolution, 9) array indexed [v][u].
+    """
+    directions = math_helpers.octahedralDirections(resolution)
+    values = sample_rig_for_directions(rig_item, directions.reshape(-1, 3))
+    return values.reshape(resolution, resolution, 9)
+
+
+def write_lut_binary(filepath, values, dtype):
+    """Raw little-endian floats, [v][u][channel], no header."""
+    values.astype(np.dtype(dtype).newbyteorder("<")).tofile(filepath)
+
+
+def write_lut_exr(filepath, values):
+    """
+    A float OpenEXR three tiles wide: position, scale and rotation
+    side by side in RGB, alpha unused.
+    """
+    height, width = values.shape[:2]
+    pixels = np.ones((height, width * 3, 4), dtype=np.float32)
+    for tile in range(3):
+        pixels[:, tile * width : (tile + 1) * width, :3] = values[
+            :, :, tile * 3 : tile * 3 + 3
+        ]
+
+    image = bpy.data.images.new(
+        "ShadingRigLUTExport",
+        width=width * 3,
+        height=height,
+        alpha=True,
+        float_buffer=True,
+    )
+    try:
+        image.colorspace_settings.is_data = True
+        image.pixels.foreach_set(pixels.ravel())
+        image.filepath_raw = filepath
+        image.file_format = "OPEN_EXR"
+        image.save()
+    finally:
+        bpy.data.images.remove(image)
+
+
+def get_lut_manifest_entry(rig_item, filename, resolution, file_format, dtype):
+    light_position = rig_item.light_object.location
+    entry = {
+        "effect": rig_item.name,
+        "empty": rig_item.empty_object.name if rig_item.empty_object else None,
+        "light": rig_item.light_object.name,
+        "file": filename,
+        "format": file_format,
+        "resolution": resolution,
+        "light_position": list(light_position),
+        "interpolation_kernel": rig_item.interpolation_kernel,
+        "link_count": len(rig_item.links),
+    }
+    if file_format == "BINARY":
+        entry["dtype"] = dtype
+        entry["layout"] = "[v][u][channel], little-endian"
+        entry["channels"] = LUT_CHANNELS
+    else:
+        entry["layout"] = "3 tiles wide: position, scale, rotation in RGB"
+    return entry
+
+
+def get_lut_manifest(entries):
+    return {
+        "version": 1,
+        "parameterization": "octahedral",
+        "direction": "light's local -Z axis in world space (the way it shines)",
+        "encode": (
+            "n = d / (|d.x| + |d.y| + |d.z|); "
+            "if n.z < 0: n.xy = (1 - |n.yx|) * sign(n.xy); "
+            "uv = n.xy * 0.5 + 0.5"
+        ),
+        "texel_centres": "(i + 0.5) / resolution, row 0 is v = 0",
+        "rotation": "XYZ Euler, radians",
+        "note": "Sampled with each light held at light_position",
+        "effects": entries,
+    }
+
+
+class SR_OT_ExportLUTs(Operator):
+    """Export effects as light-direction lookup textures for a game engine."""
+
+    bl_idname = "shading_rig.export_luts"
+    bl_label = "Export Lookup Textures"
+    bl_description = (
+        "Sample effects over every light direction and save the Empty transforms "
+        "as float textures or binary blobs, with a JSON manifest"
+    )
+
+    directory: StringProperty(subtype="DIR_PATH")
+    resolution: IntProperty(
+        name="Resolution",
+        description="Width and height of the octahedral map, per effect",
+        default=64,
+        min=4,
+        max=1024,
+    )
+    file_format: EnumProperty(
+        name="Format",
+        items=[
+            ("BINARY", "Binary", "Raw floats plus a JSON manifest"),
+            ("EXR", "OpenEXR", "Float OpenEXR textures plus a JSON manifest"),
+        ],
+        default="BINARY",
+    )
+    dtype: EnumProperty(
+        name="Precision",
+        items=[
+            ("float32", "32-bit", "Full float precision"),
+            ("float16", "16-bit", "Half floats, half the size"),
+        ],
+        default="float16",
+    )
+    selection: EnumProperty(
+        name="Effects",
+        items=[
+            ("ALL", "All Effects", "Export every effect with links"),
+            ("ACTIVE", "Active Effect", "Only export the active effect"),
+        ],
+        default="ALL",
+    )
+
+    @classmethod
+    def poll(cls, context):
+        if not any(
+            rig_item.light_object and len(rig_item.links)
+            for rig_item in context.scene.shading_rig_list
+        ):
+            cls.poll_message_set("No effects with a Light and links.")
+            return False
+        return True
+
+    def invoke(self, context, event):
+        context.window_manager.fileselect_add(self)
+        return {"RUNNING_MODAL"}
+
+    def get_rigs(self, context):
+        rig_list = context.scene.shading_rig_list
+        if self.selection == "ACTIVE":
+            index = json_helpers.get_shading_rig_list_index()
+            rigs = [rig_list[index]] if 0 <= index < len(rig_list) else []
+        else:
+            rigs = list(rig_list)
+        return [
+            rig_item for rig_item in rigs if rig_item.light_object and len(rig_item.links)
+        ]
+
+    def execute(self, context):
+        directory = bpy.path.abspath(self.directory)
+        if not os.path.isdir(directory):
+            self.report({"ERROR"}, f"'{directory}' is not a folder.")
+            return {"CANCELLED"}
+
+        rigs = self.get_rigs(context)
+        if not rigs:
+            self.report({"ERROR"}, "No effects with a Light and links to export.")
+            return {"CANCELLED"}
+
+        extension = ".exr" if self.file_format == "EXR" else ".bin"
+        entries = []
+        try:
+            for rig_item in rigs:
+                values = sample_rig_octahedral(rig_item, self.resolution)
+                filename = bpy.path.clean_name(rig_item.name) + extension
+                filepath = os.path.join(directory, filename)
+                if self.file_format == "EXR":
+                    write_lut_exr(filepath, values)
+                else:
+                    write_lut_binary(filepath, values, self.dtype)
+                entries.append(
+                    get_lut_manifest_entry(
+                        rig_item, filename, self.resolution, self.file_format, self.dtype
+                    )
+                )
+
+            with open(os.path.join(directory, LUT_MANIFEST_NAME), "w") as f:
+                json.dump(get_lut_manifest(entries), f, indent=2)
+        except Exception as e:
+            self.report({"ERROR"}, f"Failed to export lookup textures: {e}")
+            return {"CANCELLED"}
+
+        self.report(
+            {"INFO"},
+            f"Exported {len(entries)} effect(s) at {self.resolution}x{self.resolution} "
+            f"to {directory}.",
+        )
+        return {"FINISHED"}
@@ -1,81 +1,392 @@
-from mathutils import Euler, Vector
-import bpy
+import numpy as np
 
-# ----------------------- Weight calculation functions ----------------------- #
+# ------------------------ Batch (vectorized) evaluation ----------------------- #
+# Every rig's links are blended at once in NumPy, so the depsgraph handler
+# only has to write the results back.
 
+LINK_ARRAY_PROPERTIES = (
+    "light_rotation",
+    "light_position",
+    "empty_position",
+    "empty_scale",
+    "empty_rotation",
+)
 
-def getDistances(links, currentLightRotation, currentLightPosition):
+
+def eulersToQuaternions(eulers):
     """
-    Prerequisite for calculating weights;
-    Finds the angular distance between the current light rotation
-    and each of the stored light rotations.
+    Vectorized version of Euler.to_quaternion() for XYZ Eulers.
+    Takes an (N, 3) array and returns an (N, 4) array of (w, x, y, z).
     """
-    distances = []
-    current_quat = currentLightRotation.to_quaternion()
+    eulers = np.asarray(eulers, dtype=np.float64).reshape(-1, 3)
+    half = eulers * 0.5
+    ci, cj, ch = np.cos(half).T
+    si, sj, sh = np.sin(half).T
+
+    cc = ci * ch
+    cs = ci * sh
+    sc = si * ch
+    ss = si * sh
+
+    return np.stack(
+        (
+            cj * cc + sj * ss,
+            cj * sc - sj * cs,
+            cj * ss + sj * cc,
+            cj * cs - sj * sc,
+        ),
+        axis=1,
+    )
 
-    for corr in links:
-        corr_euler = corr.light_rotation
-        corr_quat = corr_euler.to_quaternion()
-        dist = current_quat.rotation_difference(corr_quat).angle
-        
-        pos_dist = (Vector(currentLightPosition) - Vector(corr.light_position)).length
-        average_dist = (dist + pos_dist) / 2.0
-        distances.append(average_dist)
 
-    return distances
+def quaternionsToDirections(quats):
+    """
+    Returns the direction each (w, x, y, z) quaternion points a light in,
+    i.e. its local -Z axis, as an (N, 3) array of unit vectors.
+    """
+    w, x, y, z = np.asarray(quats, dtype=np.float64).reshape(-1, 4).T
+    return -np.stack(
+        (
+            2.0 * (x * z + w * y),
+            2.0 * (y * z - w * x),
+            1.0 - 2.0 * (x * x + y * y),
+        ),
+        axis=1,
+    )
+
+
+def linkDistances(linkQuats, linkPositions, currentQuats, currentPositions):
+    """
+    Distances between lights, row by row: the angle of rotation_difference()
+    averaged with the positional distance.
+    """
+    dots = np.clip(np.einsum("ij,ij->i", linkQuats, currentQuats), -1.0, 1.0)
+    angular = 2.0 * np.arccos(dots)
+    positional = np.linalg.norm(currentPositions - linkPositions, axis=1)
+    return (angular + positional) / 2.0
+
+
+def fibonacciSphere(count):
+    """
+    Spreads count unit vectors evenly over a sphere (a Fibonacci lattice).
+    Returns a (count, 3) array.
+    """
+    i = np.arange(count, dtype=np.float64) + 0.5
+    z = 1.0 - 2.0 * i / count
+    radius = np.sqrt(1.0 - z * z)
+    theta = np.pi * (1.0 + 5.0**0.5) * i
+    return np.stack((radius * np.cos(theta), radius * np.sin(theta), z), axis=1)
+
+
+def octahedralDirections(resolution):
+    """
+    Unit vectors for the texel centres of a resolution x resolution
+    octahedral map (the usual way to store a sphere in one 2D texture).
+    Returns a (resolution, resolution, 3) array indexed [v][u].
+    """
+    centres = (np.arange(resolution, dtype=np.float64) + 0.5) / resolution * 2.0 - 1.0
+    x, y = np.meshgrid(centres, centres)
+    z = 1.0 - np.abs(x) - np.abs(y)
+    # The lower hemisphere is folded out into the corners
+    lower = z < 0.0
+    folded_x = (1.0 - np.abs(y)) * np.where(x >= 0.0, 1.0, -1.0)
+    folded_y = (1.0 - np.abs(x)) * np.where(y >= 0.0, 1.0, -1.0)
+    x = np.where(lower, folded_x, x)
+    y = np.where(lower, folded_y, y)
+    directions = np.stack((x, y, z), axis=2)
+    return directions / np.linalg.norm(directions, axis=2, keepdims=True)
 
 
-def getWeights(distances):
+def packLinks(links):
     """
-    Calculates normalized inverse distance weights.
-    A smaller distance results in a larger weight.
-    All weights are positive and sum to 1.0.
+    Reads a rig's links into contiguous (N, 3) arrays with foreach_get,
+    one array per stored light/empty property.
     """
-    if not distances:
-        return []
+    count = len(links)
+    packed = {}
+    buffer = np.empty(count * 3, dtype=np.float32)
+    for prop in LINK_ARRAY_PROPERTIES:
+        links.foreach_get(prop, buffer)
+        packed[prop] = buffer.astype(np.float64).reshape(count, 3)
+    packed["light_quaternion"] = eulersToQuaternions(packed["light_rotation"])
+    return packed
+
+
+def _segmentSum(values, segment_ids, segment_count):
+    """Sums the rows of an (N, K) array per segment, returning (segment_count, K)."""
+    return np.stack(
+        [
+            np.bincount(segment_ids, weights=values[:, k], minlength=segment_count)
+            for k in range(values.shape[1])
+        ],
+        axis=1,
+    )
+
+
+def calculateWeightedEmptyPositions(
+    packed_rigs, lightRotations, lightPositions, lightQuaternions=None
+):
+    """
+    Inverse distance blends every rig's links at once.
+    Takes one packed link table per rig (see packLinks) and the current
+    light rotation/position for each rig, and returns (R, 3) arrays of
+    interpolated empty positions, scales and rotations.
+    lightQuaternions can be passed if the rotations are already converted.
+    """
+    rig_count = len(packed_rigs)
+    positions = np.zeros((rig_count, 3))
+    scales = np.ones((rig_count, 3))
+    rotations = np.zeros((rig_count, 3))
+
+    counts = np.array([len(p["light_position"]) for p in packed_rigs], dtype=np.int64)
+    if rig_count == 0 or counts.sum() == 0:
+        return positions, scales, rotations
+
+    def concat(prop):
+        return np.concatenate([p[prop] for p in packed_rigs if len(p[prop])])
+
+    link_quats = concat("light_quaternion")
+    link_positions = concat("light_position")
+    rig_ids = np.repeat(np.arange(rig_count), counts)
+
+    if lightQuaternions is None:
+        lightQuaternions = eulersToQuaternions(lightRotations)
+    current_quats = np.asarray(lightQuaternions, dtype=np.float64).reshape(-1, 4)[
+        rig_ids
+    ]
+    current_positions = np.asarray(lightPositions, dtype=np.float64).reshape(-1, 3)[
+        rig_ids
+    ]
+
+    distances = linkDistances(
+        link_quats, link_positions, current_quats, current_positions
+    )
+
+    # Normalized inverse distance weights, per rig
+    weights = 1.0 / (distances + 1e-6)
+    totals = np.bincount(rig_ids, weights=weights, minlength=rig_count)
+    weights = (weights / totals[rig_ids])[:, None]
+
+    has_links = counts > 0
+    positions[has_links] = _segmentSum(
+        concat("empty_position") * weights, rig_ids, rig_count
+    )[has_links]
+    scales[has_links] = _segmentSum(
+        concat("empty_scale") * weights, rig_ids, rig_count
+    )[has_links]
+    rotations[has_links] = _segmentSum(
+        concat("empty_rotation") * weights, rig_ids, rig_count
+    )[has_links]
+
+    return positions, scales, rotations
+
+
+# ------------------------- RBF interpolation kernels ------------------------- #
+# Inverse distance weighting needs a lot of links to look smooth. A radial
+# basis function fit goes exactly through every link and is smooth in
+# between, so fewer links do the same job. The weights are solved once
+# per link set; evaluating is then one small matrix-vector product.
 
-    weights = []
-    total_weight = 0.0
-    epsilon = 1e-6
 
-    for d in distances:
-        weight = 1.0 / (d + epsilon)
-        weights.append(weight)
-        total_weight += weight
+def kernelValues(kernel, distances, radius):
+    """Applies a radial basis function to an array of link distances."""
+    if kernel == "GAUSSIAN":
+        return np.exp(-np.square(distances / radius))
+    if kernel == "THIN_PLATE":
+        safe = np.maximum(distances, 1e-12)
+        return np.where(distances > 1e-12, np.square(distances) * np.log(safe), 0.0)
+    raise ValueError(f"Unknown interpolation kernel '{kernel}'")
 
-    if total_weight > 0:
-        for i in range(len(weights)):
-            weights[i] /= total_weight
-    
-    addon_prefs = bpy.context.preferences.addons["shading-rig-and-cel-character-tools"].preferences
-    if addon_prefs.debug_mode:
-        print(weights)
 
+def pairwiseLinkDistances(quatsA, positionsA, quatsB, positionsB):
+    """linkDistances between every row of A and every row of B, as an (A, B) array."""
+    dots = np.clip(quatsA @ quatsB.T, -1.0, 1.0)
+    angular = 2.0 * np.arccos(dots)
+    positional = np.linalg.norm(positionsA[:, None, :] - positionsB[None, :, :], axis=2)
+    return (angular + positional) / 2.0
+
+
+def solveKernelWeights(kernel, packed, radius):
+    """
+    Solves the RBF weights for a packed link table.
+    Returns an (N + 1, 9) array: one row per link plus a constant term,
+    with columns for empty position, scale and rotation.
+    """
+    quats = packed["light_quaternion"]
+    positions = packed["light_position"]
+    count = len(quats)
+
+    # The constant term keeps the result sensible away from every link
+    system = np.zeros((count + 1, count + 1))
+    system[:count, :count] = kernelValues(
+        kernel, pairwiseLinkDistances(quats, positions, quats, positions), radius
+    )
+    system[:count, count] = 1.0
+    system[count, :count] = 1.0
+
+    targets = np.zeros((count + 1, 9))
+    targets[:count] = np.hstack(
+        (packed["empty_position"], packed["empty_scale"], packed["empty_rotation"])
+    )
+
+    # lstsq rather than solve, since duplicate links make the system singular
+    weights = np.linalg.lstsq(system, targets, rcond=None)[0]
     return weights
 
 
-def calculateWeightedEmptyPosition(links, currentLightRotation, currentLightPosition):
-    """
-    Given a list of light rotations -> empty positions and a current light
-    rotation, interpolates the empty position.
-    """
-    if not links:
-        return [0.0, 0.0, 0.0], [1.0, 1.0, 1.0], [0.0, 0.0, 0.0]
-    
-    if len(links) == 1:
-        return list(links[0].empty_position), list(links[0].empty_scale), list(links[0].empty_rotation)
-    
-    distances = getDistances(links, currentLightRotation, currentLightPosition)
-    weights = getWeights(distances)
-    
-    weighted_position = Vector((0.0, 0.0, 0.0))
-    weighted_scale = Vector((0.0, 0.0, 0.0))
-    weighted_rotation = Vector((0.0, 0.0, 0.0))
-    
-    for i, corr in enumerate(links):
-        weight = weights[i]
-        weighted_position += Vector(corr.empty_position) * weight
-        weighted_scale += Vector(corr.empty_scale) * weight
-        weighted_rotation += Vector(corr.empty_rotation) * weight
-    
-    return list(weighted_position), list(weighted_scale), list(weighted_rotation)
+def evaluateKernel(kernel, packed, weights, radius, lightRotations, lightPositions):
+    """
+    Evaluates a solved RBF fit for M light transforms.
+    Returns (M, 3) arrays of empty positions, scales and rotations.
+    """
+    quats = eulersToQuaternions(lightRotations)
+    positions = np.asarray(lightPositions, dtype=np.float64).reshape(-1, 3)
+
+    basis = kernelValues(
+        kernel,
+        pairwiseLinkDistances(
+            quats, positions, packed["light_quaternion"], packed["light_position"]
+        ),
+        radius,
+    )
+    result = basis @ weights[:-1] + weights[-1]
+    return result[:, 0:3], result[:, 3:6], result[:, 6:9]
+
+
+# ---------------------------- Link set reduction ----------------------------- #
+# Art direction passes pile up links that barely change anything. Links are
+# removed greedily, always the one that moves the result least, for as long
+# as the result stays within tolerance of the full link set everywhere it's
+# sampled.
+
+# RBF removals need a re-solve to check, so only try the most promising few
+KERNEL_CANDIDATES_PER_PASS = 8
+
+
+def subsetLinks(packed, indices):
+    """A packed link table cut down to the given link indices."""
+    return {prop: values[indices] for prop, values in packed.items()}
+
+
+def _linkValues(packed):
+    return np.hstack(
+        (packed["empty_position"], packed["empty_scale"], packed["empty_rotation"])
+    )
+
+
+def _reduceInverseDistance(packed, lightRotations, lightPositions, tolerance, minLinks):
+    quats = eulersToQuaternions(lightRotations)
+    positions = np.asarray(lightPositions, dtype=np.float64).reshape(-1, 3)
+    weights = 1.0 / (
+        pairwiseLinkDistances(
+            quats, positions, packed["light_quaternion"], packed["light_position"]
+        )
+        + 1e-6
+    )
+    values = _linkValues(packed)
+
+    # Keep the weighted sum and total weight, so every candidate
+    # removal can be scored at once by subtracting its share
+    numerator = weights @ values
+    denominator = weights.sum(axis=1)
+    reference = numerator / denominator[:, None]
+
+    keep = np.ones(len(values), dtype=bool)
+    while keep.sum() > minLinks:
+        candidates = np.flatnonzero(keep)
+        candidate_weights = weights[:, candidates]
+        results = (
+            numerator[:, None, :] - candidate_weights[:, :, None] * values[candidates]
+        ) / (denominator[:, None] - candidate_weights)[:, :, None]
+        errors = np.abs(results - reference[:, None, :]).max(axis=(0, 2))
+
+        best = np.argmin(errors)
+        if errors[best] > tolerance:
+            break
+        removed = candidates[best]
+        keep[removed] = False
+        numerator -= weights[:, removed, None] * values[removed]
+        denominator -= weights[:, removed]
+
+    kept = np.flatnonzero(keep)
+    final = (weights[:, kept] @ values[kept]) / weights[:, kept].sum(axis=1)[:, None]
+    return kept, float(np.abs(final - reference).max())
+
+
+def _reduceKernel(
+    kernel, packed, radius, lightRotations, lightPositions, tolerance, minLinks
+):
+    def evaluate(indices):
+        subset = subsetLinks(packed, indices)
+        weights = solveKernelWeights(kernel, subset, radius)
+        return np.hstack(
+            evaluateKernel(
+                kernel, subset, weights, radius, lightRotations, lightPositions
+            )
+        )
+
+    kept = np.arange(len(packed["light_position"]))
+    reference = evaluate(kept)
+    max_error = 0.0
+
+    while len(kept) > minLinks:
+        # Rippa's leave-one-out residuals: how badly the fit without each
+        # link would miss that link, from one pseudo-inverse
+        subset = subsetLinks(packed, kept)
+        count = len(kept)
+        system = np.zeros((count + 1, count + 1))
+        system[:count, :count] = kernelValues(
+            kernel,
+            pairwiseLinkDistances(
+                subset["light_quaternion"],
+                subset["light_position"],
+                subset["light_quaternion"],
+                subset["light_position"],
+            ),
+            radius,
+        )
+        system[:count, count] = 1.0
+        system[count, :count] = 1.0
+        inverse = np.linalg.pinv(system)
+        targets = np.zeros((count + 1, 9))
+        targets[:count] = _linkValues(subset)
+        coefficients = inverse @ targets
+        diagonal = np.abs(np.diag(inverse)[:count])
+        loo_errors = np.abs(coefficients[:count]).max(axis=1) / np.maximum(
+            diagonal, 1e-12
+        )
+
+        removed = False
+        for candidate in np.argsort(loo_errors)[:KERNEL_CANDIDATES_PER_PASS]:
+            trial = np.delete(kept, candidate)
+            error = float(np.abs(evaluate(trial) - reference).max())
+            if error <= tolerance:
+                kept = trial
+                max_error = error
+                removed = True
+                break
+        if not removed:
+            break
+
+    return kept, max_error
+
+
+def reduceLinks(
+    kernel, packed, radius, lightRotations, lightPositions, tolerance, minLinks=1
+):
+    """
+    Finds the smallest link set (greedily) whose interpolated empty
+    position/scale/rotation stays within tolerance of the full set's
+    at every sampled light transform.
+    Returns (indices of the links to keep, max error of the reduced set).
+    """
+    minLinks = max(1, minLinks)
+    if len(packed["light_position"]) <= minLinks:
+        return np.arange(len(packed["light_position"])), 0.0
+    if kernel == "INVERSE_DISTANCE":
+        return _reduceInverseDistance(
+            packed, lightRotations, lightPositions, tolerance, minLinks
+        )
+    return _reduceKernel(
+        kernel, packed, radius, lightRotations, lightPositions, tolerance, minLinks
+    )
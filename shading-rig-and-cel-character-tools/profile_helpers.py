@@ -0,0 +1,117 @@
+import os
+
+from bpy.props import EnumProperty, StringProperty
+from bpy.types import (
+    Operator,
+)
+
+from . import sr_profiler
+
+
+def draw_profile(layout, show_icons):
+    """Draws the handler timings in the preferences."""
+    summary = sr_profiler.get_summary()
+    if not summary["count"]:
+        layout.label(text="No shading rig updates recorded yet.")
+        return
+
+    col = layout.column(align=True)
+    col.label(
+        text=f"{summary['count']} updates: mean {summary['mean_ms']:.3f} ms, "
+        f"p95 {summary['p95_ms']:.3f} ms, max {summary['max_ms']:.3f} ms",
+        icon="TIME" if show_icons else "NONE",
+    )
+    col.label(
+        text=f"Rigs: {summary['evaluated']} evaluated, {summary['cached']} cached, "
+        f"{summary['skipped']} skipped, {summary['written']} written. "
+        f"{summary['ignored']} re-entrant/echo updates ignored"
+    )
+
+    histogram = sr_profiler.get_histogram()
+    largest = max(count for _, count in histogram) or 1
+    box = layout.box()
+    col = box.column(align=True)
+    for bound, count in histogram:
+        if bound is None:
+            bucket_label = f"> {sr_profiler.HISTOGRAM_BOUNDS_MS[-1]:g} ms"
+        else:
+            bucket_label = f"<= {bound:g} ms"
+        bar = "█" * round(20 * count / largest)
+        col.label(text=f"{bucket_label:>10}  {bar} {count}")
+
+    rig_summaries = sr_profiler.get_rig_summaries()
+    if rig_summaries:
+        col = layout.column(align=True)
+        col.label(text="Slowest effects:")
+        for rig_name, rig_summary in list(rig_summaries.items())[:5]:
+            col.label(
+                text=f"{rig_name}: mean {rig_summary['mean_ms']:.3f} ms, "
+                f"max {rig_summary['max_ms']:.3f} ms ({rig_summary['count']} runs)"
+            )
+
+
+class SR_OT_ExportHandlerProfile(Operator):
+    """Export the recorded shading rig handler timings."""
+
+    bl_idname = "shading_rig.export_handler_profile"
+    bl_label = "Export Profile"
+    bl_description = "Save the recorded handler timings to a JSON or CSV file"
+
+    filepath: StringProperty(subtype="FILE_PATH")
+    file_format: EnumProperty(
+        name="Format",
+        items=[
+            ("JSON", "JSON", "Summary, histogram, per-effect timings and every update"),
+            (
+                "CSV",
+                "CSV",
+                "One row per update, plus a second _rigs.csv with per-effect timings",
+            ),
+        ],
+        default="JSON",
+    )
+
+    @classmethod
+    def poll(cls, context):
+        if not sr_profiler.get_invocations():
+            cls.poll_message_set("No shading rig updates recorded yet.")
+            return False
+        return True
+
+    def invoke(self, context, event):
+        if not self.filepath:
+            self.filepath = "shading_rig_profile.json"
+        context.window_manager.fileselect_add(self)
+        return {"RUNNING_MODAL"}
+
+    def execute(self, context):
+        extension = "." + self.file_format.lower()
+        filepath = self.filepath
+        if os.path.splitext(filepath)[1].lower() != extension:
+            filepath = os.path.splitext(filepath)[0] + extension
+
+        try:
+            if self.file_format == "CSV":
+                rigs_filepath = sr_profiler.export_csv(filepath)
+                self.report(
+                    {"INFO"}, f"Exported profile to {filepath} and {rigs_filepath}."
+                )
+            else:
+                sr_profiler.export_json(filepath)
+                self.report({"INFO"}, f"Exported profile to {filepath}.")
+        except OSError as e:
+            self.report({"ERROR"}, f"Failed to export profile: {e}")
+            return {"CANCELLED"}
+        return {"FINISHED"}
+
+
+class SR_OT_ResetHandlerProfile(Operator):
+    """Clear the recorded shading rig handler timings."""
+
+    bl_idname = "shading_rig.reset_handler_profile"
+    bl_label = "Reset Profile"
+    bl_description = "Clear the recorded handler timings"
+
+    def execute(self, context):
+        sr_profiler.reset()
+        return {"FINISHED"}
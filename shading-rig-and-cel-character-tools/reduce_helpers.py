@@ -0,0 +1,143 @@
+import bpy
+import numpy as np
+from bpy.props import FloatProperty, IntProperty
+from bpy.types import (
+    Operator,
+)
+
+from . import json_helpers, lut_helpers, math_helpers, sr_link_cache
+
+# ---------------------------------------------------------------------------- #
+#                              Link set reduction                              #
+# ---------------------------------------------------------------------------- #
+
+
+def get_reduction_samples(rig_item, sample_count):
+    """
+    Light transforms to compare the reduced rig against: a lattice of
+    directions at the light's current location, plus every link's own
+    light transform (where the links matter most).
+    Returns (rotations, positions) arrays.
+    """
+    directions = math_helpers.fibonacciSphere(sample_count)
+    rotations = lut_helpers.get_sample_rotations(directions)
+    positions = np.tile(
+        np.asarray(rig_item.light_object.location, dtype=np.float64), (sample_count, 1)
+    )
+
+    arrays = sr_link_cache.get_compiled_links(rig_item).arrays
+    return (
+        np.vstack((rotations, arrays["light_rotation"])),
+        np.vstack((positions, arrays["light_position"])),
+    )
+
+
+def reduce_rig_links(rig_item, tolerance, sample_count, min_links=1):
+    """
+    Works out which of a rig's links can go without moving its Empty by more
+    than tolerance at any sample. Always measured against every link, even
+    with "Nearest Links Only" on, since that's what the nearest links
+    approximate. Returns (indices to keep, max error).
+    """
+    rotations, positions = get_reduction_samples(rig_item, sample_count)
+    compiled = sr_link_cache.get_compiled_links(rig_item)
+    return math_helpers.reduceLinks(
+        rig_item.interpolation_kernel,
+        compiled.arrays,
+        rig_item.kernel_radius,
+        rotations,
+        positions,
+        tolerance,
+        min_links,
+    )
+
+
+class SR_OT_ReduceLinks(Operator):
+    """Remove links from the active effect that don't change its result."""
+
+    bl_idname = "shading_rig.reduce_links"
+    bl_label = "Reduce Links"
+    bl_description = (
+        "Remove links whose removal moves the Empty by less than the tolerance "
+        "for every sampled light direction"
+    )
+    bl_options = {"REGISTER", "UNDO"}
+
+    tolerance: FloatProperty(
+        name="Tolerance",
+        description="Largest change allowed in any Empty location, scale or rotation value",
+        default=0.001,
+        min=0.0,
+        soft_max=0.1,
+        precision=4,
+    )
+    sample_count: IntProperty(
+        name="Light Directions",
+        description="How many light directions to check the result at",
+        default=512,
+        min=16,
+        max=8192,
+    )
+    min_links: IntProperty(
+        name="Keep at Least",
+        description="Never reduce the effect below this many links",
+        default=2,
+        min=1,
+    )
+
+    @classmethod
+    def poll(cls, context):
+        scene = context.scene
+        if not (
+            json_helpers.get_shading_rig_list_index() >= 0
+            and len(scene.shading_rig_list) > 0
+        ):
+            cls.poll_message_set("No effects in the list.")
+            return False
+
+        active_item = scene.shading_rig_list[json_helpers.get_shading_rig_list_index()]
+        if not active_item.light_object:
+            cls.poll_message_set("Active effect needs a Light Object.")
+            return False
+
+        if len(active_item.links) < 2:
+            cls.poll_message_set("Active effect needs at least two links.")
+            return False
+
+        return True
+
+    def invoke(self, context, event):
+        return context.window_manager.invoke_props_dialog(self)
+
+    def execute(self, context):
+        scene = context.scene
+        rig_item = scene.shading_rig_list[json_helpers.get_shading_rig_list_index()]
+        before_count = len(rig_item.links)
+
+        try:
+            kept, max_error = reduce_rig_links(
+                rig_item, self.tolerance, self.sample_count, self.min_links
+            )
+        except Exception as e:
+            self.report({"ERROR"}, f"Failed to reduce links: {e}")
+            return {"CANCELLED"}
+
+        kept = set(int(index) for index in kept)
+        # Backwards, so the indices still to remove don't shift
+        for index in reversed(range(before_count)):
+            if index not in kept:
+                rig_item.links.remove(index)
+        sr_link_cache.invalidate(rig_item)
+
+        if rig_item.correlations_index >= len(rig_item.links):
+            rig_item.correlations_index = len(rig_item.links) - 1
+        # The edit mode handler may be holding on to a link we just removed
+        bpy.types.Scene.previous_corr = None
+
+        json_helpers.sync_scene_to_json(scene)
+        self.report(
+            {"INFO"},
+            f"Reduced '{rig_item.name}' from {before_count} to {len(rig_item.links)} "
+            f"links (max error {max_error:.5f}).",
+        )
+        return {"FINISHED"}
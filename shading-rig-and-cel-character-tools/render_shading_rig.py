@@ -0,0 +1,66 @@
+"""
+Renders a frame range in the background with every shading rig evaluated
+per frame. Run it with Blender, not on its own:
+
+    blender -b shot.blend --python render_shading_rig.py -- --start 1 --end 120 --output //render/shot_####
+
+Everything after "--" is optional; by default the scene's own frame range
+and output path are used.
+"""
+
+import argparse
+import sys
+
+import addon_utils
+import bpy
+
+ADDON_NAME = "shading-rig-and-cel-character-tools"
+
+
+def parse_args():
+    argv = sys.argv[sys.argv.index("--") + 1 :] if "--" in sys.argv else []
+    parser = argparse.ArgumentParser(
+        description="Render a frame range with shading rigs evaluated every frame"
+    )
+    parser.add_argument("--scene", help="Scene to render (default: the active one)")
+    parser.add_argument("--start", type=int, help="First frame")
+    parser.add_argument("--end", type=int, help="Last frame")
+    parser.add_argument("--step", type=int, help="Frame step")
+    parser.add_argument("--output", help="Output path, e.g. //render/shot_####")
+    return parser.parse_args(argv)
+
+
+def main():
+    args = parse_args()
+
+    # The farm's Blender may not have the addon enabled in its preferences
+    _, loaded = addon_utils.check(ADDON_NAME)
+    if not loaded:
+        if not addon_utils.enable(ADDON_NAME, default_set=False, persistent=True):
+            print(f"Shading Rig: could not enable the '{ADDON_NAME}' addon")
+            sys.exit(1)
+
+    scene = bpy.data.scenes.get(args.scene) if args.scene else bpy.context.scene
+    if scene is None:
+        print(f"Shading Rig: no scene named '{args.scene}'")
+        sys.exit(1)
+
+    if args.start is not None:
+        scene.frame_start = args.start
+    if args.end is not None:
+        scene.frame_end = args.end
+    if args.step is not None:
+        scene.frame_step = args.step
+    if args.output:
+        scene.render.filepath = args.output
+
+    effect_count = len(scene.shading_rig_list)
+    print(
+        f"Shading Rig: rendering '{scene.name}' frames {scene.frame_start}-"
+        f"{scene.frame_end} with {effect_count} effect(s)"
+    )
+    bpy.ops.render.render(animation=True, scene=scene.name)
+
+
+if __name__ == "__main__":
+    main()
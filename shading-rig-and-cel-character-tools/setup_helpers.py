@@ -6,7 +6,7 @@ from bpy.types import (
 )
 from mathutils import Matrix, Vector
 
-from . import hansens_float_packer, json_helpers, node_helpers
+from . import hansens_float_packer, json_helpers, node_helpers, sr_packing
 
 def update_material(self, context):
     self.added_to_material = False
@@ -117,7 +117,7 @@ class SR_OT_AddEffectCoordinatesNode(Operator):
         attr_node = node_tree.nodes.new("ShaderNodeAttribute")
         attr_node.attribute_name = f"packed:{empty_obj.name}"
         attr_node.label = f"packed:{empty_obj.name}"
-        attr_node.attribute_type = "OBJECT"
+        attr_node.attribute_type = sr_packing.get_attribute_type(scene)
 
         previous_link = None
         if dest_node.inputs[0].is_linked:
@@ -162,6 +162,8 @@ class SR_OT_AddEffectCoordinatesNode(Operator):
         node_tree.links.new(final_output, dest_node.inputs[0])
 
         active_item.added_to_material = True
+        if sr_packing.use_push_packing(scene):
+            sr_packing.push_packed_values([active_item])
         self.report(
             {"INFO"},
             f"Node group and drivers added to material '{material.name}'.",
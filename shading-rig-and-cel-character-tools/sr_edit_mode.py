@@ -3,7 +3,7 @@ from bpy.types import (
     Operator,
 )
 
-from . import json_helpers
+from . import json_helpers, sr_link_cache
 
 class SR_OT_ToggleEditMode(Operator):
     """Toggle Edit Mode for the active object"""
@@ -12,6 +12,8 @@ class SR_OT_ToggleEditMode(Operator):
     bl_options = {'REGISTER', 'UNDO'}
 
     def execute(self, context):
+        # Links may have been edited numerically, so recompile them either way
+        sr_link_cache.invalidate_all()
         if bpy.types.Scene.is_evaluating_shading_rig:
             bpy.types.Scene.is_evaluating_shading_rig = False
             json_helpers.sync_scene_to_json(context.scene)
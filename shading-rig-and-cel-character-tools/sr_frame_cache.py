@@ -0,0 +1,82 @@
+from collections import OrderedDict
+
+# ---------------------------------------------------------------------------- #
+#                          Frame-indexed result cache                          #
+# ---------------------------------------------------------------------------- #
+
+# Looping playback over a shot recomputes the same interpolation for the same
+# light transform on every pass. Results are cached per (rig, frame) the first
+# time through, and replayed after that. Each entry remembers the light
+# transform it was computed from, so editing the light's animation just
+# turns the next lookup into a miss.
+
+DEFAULT_CAPACITY = 20000
+
+_frame_cache = OrderedDict()
+# {rig_key: set of frames} for the entries in _frame_cache, so invalidating
+# one rig (every Edit Mode drag) doesn't walk the whole cache
+_rig_frames = {}
+_capacity = DEFAULT_CAPACITY
+
+
+def set_capacity(capacity):
+    """Changes the maximum number of cached (rig, frame) entries."""
+    global _capacity
+    _capacity = max(0, int(capacity))
+    _evict()
+
+
+def _evict():
+    while len(_frame_cache) > _capacity:
+        # Least recently used first
+        (rig_key, frame), _ = _frame_cache.popitem(last=False)
+        _forget_frame(rig_key, frame)
+
+
+def _forget_frame(rig_key, frame):
+    frames = _rig_frames.get(rig_key)
+    if frames is None:
+        return
+    frames.discard(frame)
+    if not frames:
+        del _rig_frames[rig_key]
+
+
+def lookup(rig_key, frame, light_rotation, light_position):
+    """
+    Returns the cached (position, scale, rotation) for a rig on a frame,
+    or None if it's missing or the light has moved since.
+    """
+    entry = _frame_cache.get((rig_key, frame))
+    if entry is None:
+        return None
+    if entry[0] != tuple(light_rotation) or entry[1] != tuple(light_position):
+        return None
+    _frame_cache.move_to_end((rig_key, frame))
+    return entry[2]
+
+
+def store(rig_key, frame, light_rotation, light_position, result):
+    """Caches a rig's evaluated (position, scale, rotation) for a frame."""
+    if _capacity <= 0:
+        return
+    key = (rig_key, frame)
+    _frame_cache[key] = (tuple(light_rotation), tuple(light_position), result)
+    _frame_cache.move_to_end(key)
+    _rig_frames.setdefault(rig_key, set()).add(frame)
+    _evict()
+
+
+def invalidate_rig(rig_key):
+    """Drops every cached frame of one rig (link or interpolation edits)."""
+    for frame in _rig_frames.pop(rig_key, ()):
+        del _frame_cache[(rig_key, frame)]
+
+
+def invalidate_all():
+    _frame_cache.clear()
+    _rig_frames.clear()
+
+
+def get_entry_count():
+    return len(_frame_cache)
@@ -0,0 +1,409 @@
+import zlib
+
+import numpy as np
+from mathutils import Vector, kdtree
+
+from . import math_helpers, sr_frame_cache
+
+# ---------------------------------------------------------------------------- #
+#                             Compiled link tables                             #
+# ---------------------------------------------------------------------------- #
+
+# Links only change through SR_OT_Link_Add, SR_OT_Link_Remove and Edit Mode,
+# so there's no reason to read them back out of RNA (and convert every
+# Euler to a quaternion) every time the light moves. Each rig gets a
+# compiled, array-backed copy that's rebuilt only after it's invalidated.
+
+_compiled_links = {}
+
+# Bumped on every invalidation, so the live update knows to re-evaluate
+# rigs even if their lights haven't moved
+_generation = 0
+
+# The combined distance is (rotation angle + position distance) / 2, and the
+# angle between two lights' directions is never more than the angle between
+# their rotations. So a link within distance D of the light has a direction
+# within 2 * D of the light's, and a KD-tree over directions can find every
+# link that could be among the k nearest: find_n(k) gives an upper bound D,
+# find_range(2 * D) gives every candidate, and those are ranked exactly.
+NEAREST_RANGE_EPSILON = 1e-5
+
+# A LUT only covers the light's direction. It's sampled with the light held
+# where it was at bake time and rolled the way lut_helpers points it, so
+# once the light moves or rolls away from that, it's blended directly again.
+LUT_POSITION_TOLERANCE = 1e-3
+LUT_ROLL_TOLERANCE = 0.01
+
+
+class CompiledLinks:
+    """Array-backed copy of a rig's links, with light quaternions precomputed."""
+
+    __slots__ = (
+        "count",
+        "arrays",
+        "signature",
+        "lut",
+        "lut_signature",
+        "_direction_tree",
+        "_kernel_key",
+        "_kernel_weights",
+    )
+
+    def __init__(self, links):
+        self.count = len(links)
+        self.arrays = math_helpers.packLinks(links)
+        # Changes whenever any stored link value changes
+        self.signature = zlib.crc32(
+            b"".join(
+                self.arrays[prop].tobytes()
+                for prop in math_helpers.LINK_ARRAY_PROPERTIES
+            )
+        )
+        self.lut = None
+        self.lut_signature = None
+        self._direction_tree = None
+        self._kernel_key = None
+        self._kernel_weights = None
+
+    @property
+    def direction_tree(self):
+        """KD-tree over link light directions, built on first use."""
+        if self._direction_tree is None:
+            directions = math_helpers.quaternionsToDirections(
+                self.arrays["light_quaternion"]
+            )
+            tree = kdtree.KDTree(self.count)
+            for index, direction in enumerate(directions):
+                tree.insert(direction, index)
+            tree.balance()
+            self._direction_tree = tree
+        return self._direction_tree
+
+    def _link_distances(self, indices, current_quat, light_position):
+        return math_helpers.linkDistances(
+            self.arrays["light_quaternion"][indices],
+            self.arrays["light_position"][indices],
+            current_quat,
+            light_position,
+        )
+
+    def nearest_arrays(self, light_rotation, light_position, k):
+        """Returns the link arrays cut down to the k links nearest the light."""
+        current_quat = math_helpers.eulersToQuaternions(light_rotation)
+        light_position = np.asarray(light_position, dtype=np.float64).reshape(1, 3)
+        direction = math_helpers.quaternionsToDirections(current_quat)[0]
+        tree = self.direction_tree
+
+        # Any k links bound how far the k nearest can be (see above)
+        indices = np.array(
+            [index for _, index, _ in tree.find_n(direction, k)], dtype=np.int64
+        )
+        bound = self._link_distances(indices, current_quat, light_position).max()
+        angle = 2.0 * bound + NEAREST_RANGE_EPSILON
+        if angle < np.pi:
+            # Chord length between two unit vectors angle apart
+            radius = 2.0 * np.sin(angle / 2.0) + NEAREST_RANGE_EPSILON
+            in_range = [index for _, index, _ in tree.find_range(direction, radius)]
+            indices = np.union1d(indices, np.array(in_range, dtype=np.int64))
+        else:
+            # Could be any of them
+            indices = np.arange(self.count)
+
+        distances = self._link_distances(indices, current_quat, light_position)
+        if k < len(indices):
+            nearest = np.argpartition(distances, k - 1)[:k]
+        else:
+            nearest = np.arange(len(indices))
+        indices = indices[nearest[np.argsort(distances[nearest], kind="stable")]]
+
+        return {prop: values[indices] for prop, values in self.arrays.items()}
+
+    def evaluate_kernel(self, kernel, radius, light_rotations, light_positions):
+        """Evaluates an RBF kernel, solving its weights only if the kernel changed."""
+        if self._kernel_key != (kernel, radius):
+            self._kernel_weights = math_helpers.solveKernelWeights(
+                kernel, self.arrays, radius
+            )
+            self._kernel_key = (kernel, radius)
+        return math_helpers.evaluateKernel(
+            kernel,
+            self.arrays,
+            self._kernel_weights,
+            radius,
+            light_rotations,
+            light_positions,
+        )
+
+
+class BakedLUT:
+    """
+    Empty transforms sampled over a Fibonacci lattice of light directions.
+    Looking one up costs the same no matter how many links the rig has.
+    """
+
+    __slots__ = ("values", "light_position", "tree")
+
+    def __init__(self, values, light_position):
+        self.values = np.asarray(values, dtype=np.float64).reshape(-1, 9)
+        self.light_position = np.asarray(light_position, dtype=np.float64)
+        directions = math_helpers.fibonacciSphere(len(self.values))
+        self.tree = kdtree.KDTree(len(directions))
+        for index, direction in enumerate(directions):
+            self.tree.insert(direction, index)
+        self.tree.balance()
+
+    def matches(self, light_rotation, light_position):
+        """Whether the light is where, and rolled how, the LUT was baked for."""
+        offset = np.asarray(light_position, dtype=np.float64) - self.light_position
+        if np.linalg.norm(offset) > LUT_POSITION_TOLERANCE:
+            return False
+        current_quat = math_helpers.eulersToQuaternions(light_rotation)[0]
+        direction = math_helpers.quaternionsToDirections(current_quat)[0]
+        baked_quat = np.array(Vector(direction).to_track_quat("-Z", "Y"))
+        dot = min(1.0, abs(float(current_quat @ baked_quat)))
+        return 2.0 * np.arccos(dot) <= LUT_ROLL_TOLERANCE
+
+    def lookup(self, light_rotation):
+        """Blends the three lattice samples closest to the light's direction."""
+        direction = math_helpers.quaternionsToDirections(
+            math_helpers.eulersToQuaternions(light_rotation)
+        )[0]
+        nearest = self.tree.find_n(direction, 3)
+        indices = [index for _, index, _ in nearest]
+        weights = np.array([1.0 / (dist + 1e-6) for _, _, dist in nearest])
+        weights /= weights.sum()
+        blended = weights @ self.values[indices]
+        return blended[0:3], blended[3:6], blended[6:9]
+
+    def lookup_many(self, light_rotations):
+        """lookup for an (M, 3) array of rotations. Returns (M, 3) arrays."""
+        blended = np.array(
+            [np.concatenate(self.lookup(rotation)) for rotation in light_rotations]
+        ).reshape(-1, 9)
+        return blended[:, 0:3], blended[:, 3:6], blended[:, 6:9]
+
+
+def get_lut_signature(rig_item, compiled):
+    """A LUT is only valid for the links and settings it was baked with."""
+    return (
+        f"{compiled.signature:08x}:{rig_item.interpolation_kernel}:"
+        f"{rig_item.kernel_radius:.4f}:{int(rig_item.use_nearest_links)}:"
+        f"{rig_item.nearest_link_count}:{rig_item.lut_resolution}"
+    )
+
+
+def get_baked_lut(rig_item):
+    """
+    Returns the rig's BakedLUT, or None if it was never baked
+    or the links/settings have changed since.
+    """
+    compiled = get_compiled_links(rig_item)
+    signature = get_lut_signature(rig_item, compiled)
+    if compiled.lut_signature != signature:
+        compiled.lut = None
+        compiled.lut_signature = signature
+        empty_obj = rig_item.empty_object
+        if (
+            empty_obj
+            and empty_obj.get("shading_rig_lut_signature") == signature
+            and "shading_rig_lut" in empty_obj
+            and "shading_rig_lut_light_position" in empty_obj
+        ):
+            compiled.lut = BakedLUT(
+                empty_obj["shading_rig_lut"],
+                empty_obj["shading_rig_lut_light_position"],
+            )
+    return compiled.lut
+
+
+def store_baked_lut(rig_item, values, light_position):
+    """
+    Stores a freshly baked LUT, and the light position it was sampled at,
+    on the rig's Empty so it's saved with the file.
+    """
+    compiled = get_compiled_links(rig_item)
+    signature = get_lut_signature(rig_item, compiled)
+    values = np.asarray(values, dtype=np.float64).reshape(-1, 9)
+
+    empty_obj = rig_item.empty_object
+    empty_obj["shading_rig_lut"] = values.ravel().tolist()
+    empty_obj["shading_rig_lut_signature"] = signature
+    empty_obj["shading_rig_lut_light_position"] = list(light_position)
+
+    compiled.lut = BakedLUT(values, light_position)
+    compiled.lut_signature = signature
+    sr_frame_cache.invalidate_rig(get_rig_key(rig_item))
+
+
+def get_rig_key(rig_item):
+    """Rig items live in a CollectionProperty, so their pointers aren't stable."""
+    return (rig_item.id_data.name, rig_item.name)
+
+
+def get_compiled_links(rig_item):
+    """Returns the cached CompiledLinks for a rig, compiling them if needed."""
+    key = get_rig_key(rig_item)
+    compiled = _compiled_links.get(key)
+    # Everything that edits links invalidates the cache,
+    # but a length check is cheap insurance
+    if compiled is None or compiled.count != len(rig_item.links):
+        compiled = CompiledLinks(rig_item.links)
+        _compiled_links[key] = compiled
+    return compiled
+
+
+def get_link_arrays(rig_item, light_rotation, light_position):
+    """
+    Returns the link arrays a rig should blend for the given light:
+    all of them, or only the nearest ones if the rig asks for that.
+    """
+    compiled = get_compiled_links(rig_item)
+    if rig_item.use_nearest_links and compiled.count > rig_item.nearest_link_count:
+        return compiled.nearest_arrays(
+            light_rotation, light_position, rig_item.nearest_link_count
+        )
+    return compiled.arrays
+
+
+def evaluate_rig_samples(rig_item, light_rotations, light_positions, use_lut=False):
+    """
+    Evaluates one rig for many light transforms at once (baking keyframes
+    and LUTs). With use_lut, samples a valid LUT covers are looked up, the
+    same as the live update does; LUTs themselves are sampled from the links.
+    Returns (M, 3) arrays of empty positions, scales and rotations.
+    """
+    light_rotations = np.asarray(light_rotations, dtype=np.float64).reshape(-1, 3)
+    light_positions = np.asarray(light_positions, dtype=np.float64).reshape(-1, 3)
+    lut = get_baked_lut(rig_item) if use_lut and rig_item.use_lut else None
+    if lut:
+        covered = np.array(
+            [
+                lut.matches(rotation, position)
+                for rotation, position in zip(light_rotations, light_positions)
+            ],
+            dtype=bool,
+        )
+        if covered.any():
+            results = tuple(np.zeros((len(light_rotations), 3)) for _ in range(3))
+            for result, looked_up in zip(
+                results, lut.lookup_many(light_rotations[covered])
+            ):
+                result[covered] = looked_up
+            if not covered.all():
+                for result, evaluated in zip(
+                    results,
+                    evaluate_rig_samples(
+                        rig_item, light_rotations[~covered], light_positions[~covered]
+                    ),
+                ):
+                    result[~covered] = evaluated
+            return results
+
+    compiled = get_compiled_links(rig_item)
+
+    if rig_item.interpolation_kernel != "INVERSE_DISTANCE" and compiled.count:
+        return compiled.evaluate_kernel(
+            rig_item.interpolation_kernel,
+            rig_item.kernel_radius,
+            light_rotations,
+            light_positions,
+        )
+
+    if rig_item.use_nearest_links and compiled.count > rig_item.nearest_link_count:
+        arrays = [
+            compiled.nearest_arrays(rotation, position, rig_item.nearest_link_count)
+            for rotation, position in zip(light_rotations, light_positions)
+        ]
+    else:
+        arrays = [compiled.arrays] * len(light_rotations)
+
+    return math_helpers.calculateWeightedEmptyPositions(
+        arrays, light_rotations, light_positions
+    )
+
+
+def evaluate_rigs(rig_items, light_rotations, light_positions, light_quaternions=None):
+    """
+    Evaluates a list of rigs, one light rotation/position per rig.
+    Rigs with a valid baked LUT are looked up, inverse distance rigs are
+    blended together in one batch, RBF rigs use their cached kernel weights.
+    light_quaternions can be passed if the rotations are already converted.
+    Returns (R, 3) arrays of empty positions, scales and rotations.
+    """
+    light_rotations = np.asarray(light_rotations, dtype=np.float64).reshape(-1, 3)
+    light_positions = np.asarray(light_positions, dtype=np.float64).reshape(-1, 3)
+    if light_quaternions is None:
+        light_quaternions = math_helpers.eulersToQuaternions(light_rotations)
+    light_quaternions = np.asarray(light_quaternions, dtype=np.float64).reshape(-1, 4)
+
+    rig_count = len(rig_items)
+    positions = np.zeros((rig_count, 3))
+    scales = np.ones((rig_count, 3))
+    rotations = np.zeros((rig_count, 3))
+
+    blend_indices = []
+    blend_arrays = []
+    kernel_indices = []
+    for i, rig_item in enumerate(rig_items):
+        if rig_item.use_lut:
+            lut = get_baked_lut(rig_item)
+            if lut and lut.matches(light_rotations[i], light_positions[i]):
+                positions[i], scales[i], rotations[i] = lut.lookup(light_rotations[i])
+                continue
+            # A stale LUT, or a light that's moved or rolled since baking,
+            # falls back to evaluating the links directly
+        if rig_item.interpolation_kernel != "INVERSE_DISTANCE" and len(rig_item.links):
+            kernel_indices.append(i)
+            continue
+        blend_indices.append(i)
+        blend_arrays.append(
+            get_link_arrays(rig_item, light_rotations[i], light_positions[i])
+        )
+
+    if blend_indices:
+        (
+            positions[blend_indices],
+            scales[blend_indices],
+            rotations[blend_indices],
+        ) = math_helpers.calculateWeightedEmptyPositions(
+            blend_arrays,
+            light_rotations[blend_indices],
+            light_positions[blend_indices],
+            light_quaternions[blend_indices],
+        )
+
+    for i in kernel_indices:
+        rig_item = rig_items[i]
+        kernel_position, kernel_scale, kernel_rotation = get_compiled_links(
+            rig_item
+        ).evaluate_kernel(
+            rig_item.interpolation_kernel,
+            rig_item.kernel_radius,
+            light_rotations[i],
+            light_positions[i],
+        )
+        positions[i] = kernel_position[0]
+        scales[i] = kernel_scale[0]
+        rotations[i] = kernel_rotation[0]
+
+    return positions, scales, rotations
+
+
+def get_generation():
+    return _generation
+
+
+def invalidate(rig_item):
+    """Drop the compiled links of a single rig."""
+    global _generation
+    _generation += 1
+    _compiled_links.pop(get_rig_key(rig_item), None)
+    sr_frame_cache.invalidate_rig(get_rig_key(rig_item))
+
+
+def invalidate_all():
+    """Drop every compiled link table (file load, undo, leaving Edit Mode)."""
+    global _generation
+    _generation += 1
+    _compiled_links.clear()
+    sr_frame_cache.invalidate_all()
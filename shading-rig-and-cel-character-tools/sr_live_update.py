@@ -0,0 +1,587 @@
+import time
+from collections import OrderedDict
+
+import bpy
+
+from . import sr_frame_cache, sr_link_cache, sr_packing, sr_param_texture, sr_profiler
+
+# ---------------------------------------------------------------------------- #
+#                      Live mode: move empties with lights                     #
+# ---------------------------------------------------------------------------- #
+
+# The transform each light was last evaluated at, per scene:
+# {scene session_uid: {light session_uid: [rotation, position]}}
+# Session uids are never reused within a session (names are), so a light in a
+# newly loaded file can't match an old entry. Cleared on file load, and pruned
+# whenever lights or scenes go away, so it stays small in long sessions.
+_previous_light_transforms = {}
+
+# What the last handler run saw, to tell when everything needs a look
+# (_last_frame is a (scene session_uid, frame) pair)
+_last_frame = None
+_last_link_generation = None
+
+# Light session_uid -> indices of the rigs it drives. Most characters drive
+# several effects from one key light, so each light is read,
+# change-checked and converted once, then shared by all of its rigs.
+_light_index = {}
+_light_index_key = None
+
+# How much work the last update did, so big scenes can confirm the savings
+handler_stats = {
+    "evaluated": 0,
+    "cached": 0,
+    "skipped": 0,
+    "written": 0,
+    "queued": 0,
+}
+
+# Every transform or ID property the handler writes tags the depsgraph,
+# which fires the handler again. Objects it wrote are remembered so the
+# echo update can be told apart from a real user edit and dropped.
+_handler_running = False
+_own_writes = set()
+
+# Anything closer than this is the same value, don't bother writing it
+WRITE_TOLERANCE = 1e-6
+
+
+def is_handler_running():
+    return _handler_running
+
+
+def set_handler_running(running):
+    global _handler_running
+    _handler_running = running
+
+
+def mark_own_write(obj):
+    """Remembers an object the handler just wrote, so its echo update is ignored."""
+    if obj:
+        _own_writes.add(obj.name_full)
+
+
+def is_own_update(scene, depsgraph):
+    """
+    True if this depsgraph update only reports objects the handler itself
+    wrote last run, i.e. it's the echo of our own writes.
+    Scene/material updates that come along with it don't count.
+    """
+    if not _own_writes:
+        return False
+    if _last_frame is not None and _last_frame != (
+        scene.session_uid,
+        scene.frame_current,
+    ):
+        return False
+
+    saw_own_write = False
+    for update in depsgraph.updates:
+        obj = update.id
+        if not isinstance(obj, bpy.types.Object):
+            continue
+        if obj.original.name_full not in _own_writes:
+            return False
+        saw_own_write = True
+
+    if saw_own_write:
+        # Only swallow the echo once
+        _own_writes.clear()
+    return saw_own_write
+
+
+def clear_own_writes():
+    _own_writes.clear()
+
+
+def _write_if_changed(obj, attribute, value):
+    current = getattr(obj, attribute)
+    if all(abs(a - b) < WRITE_TOLERANCE for a, b in zip(current, value)):
+        return False
+    setattr(obj, attribute, value)
+    return True
+
+
+def write_results(results):
+    """
+    Applies every rig's (position, scale, rotation) in one pass,
+    only touching the values that actually changed.
+    Returns how many Empties were written.
+    """
+    written_count = 0
+    for empty_obj, (position, scale, rotation) in results:
+        changed = _write_if_changed(empty_obj, "location", position)
+        changed = _write_if_changed(empty_obj, "scale", scale) or changed
+        changed = _write_if_changed(empty_obj, "rotation_euler", rotation) or changed
+        if changed:
+            mark_own_write(empty_obj)
+            written_count += 1
+    return written_count
+
+
+def get_updated_lights(depsgraph):
+    """session_uids of the light objects whose transforms changed in this depsgraph update."""
+    updated_lights = set()
+    for update in depsgraph.updates:
+        if not update.is_updated_transform:
+            continue
+        obj = update.id
+        if isinstance(obj, bpy.types.Object) and obj.type == "LIGHT":
+            updated_lights.add(obj.original.session_uid)
+    return updated_lights
+
+
+def get_scene_light_transforms(scene):
+    """The previous light transforms for one scene."""
+    return _previous_light_transforms.setdefault(scene.session_uid, {})
+
+
+def prune_light_transforms(scene, light_index):
+    """Forgets scenes that are gone, and lights this scene's rigs no longer use."""
+    scene_uids = {other_scene.session_uid for other_scene in bpy.data.scenes}
+    for scene_uid in list(_previous_light_transforms):
+        if scene_uid not in scene_uids:
+            del _previous_light_transforms[scene_uid]
+
+    light_transforms = _previous_light_transforms.get(scene.session_uid, {})
+    for light_uid in list(light_transforms):
+        if light_uid not in light_index:
+            del light_transforms[light_uid]
+
+
+def clear_light_transforms():
+    """Forgets everything the live update has seen (file load)."""
+    global _last_frame, _last_link_generation, _light_index, _light_index_key
+    _previous_light_transforms.clear()
+    _last_frame = None
+    _last_link_generation = None
+    _light_index = {}
+    _light_index_key = None
+
+
+def get_light_index(scene):
+    """
+    Returns {light session_uid: [rig indices]}, rebuilding it when rigs are
+    added or removed, any rig's light changes (which invalidates its links),
+    or objects are added or deleted.
+    """
+    global _light_index, _light_index_key
+
+    rig_list = scene.shading_rig_list
+    index_key = (
+        scene.session_uid,
+        len(rig_list),
+        sr_link_cache.get_generation(),
+        len(bpy.data.objects),
+    )
+    if index_key != _light_index_key:
+        _light_index = {}
+        for i, rig_item in enumerate(rig_list):
+            if rig_item.light_object:
+                _light_index.setdefault(rig_item.light_object.session_uid, []).append(
+                    i
+                )
+        _light_index_key = index_key
+        prune_light_transforms(scene, _light_index)
+    return _light_index
+
+
+def sync_empty_rename(rig_item):
+    """Keeps the effect's shader node names in step with its Empty's name."""
+    # realistically, though, something is almost certain
+    # to break if you rename an effect...
+    # I'll probably fix that at some point
+    current_empty_name = rig_item.empty_object.name
+    if rig_item.last_empty_name and rig_item.last_empty_name != current_empty_name:
+        old_empty_name = rig_item.last_empty_name
+
+        if rig_item.material and rig_item.material.node_tree:
+            node_tree = rig_item.material.node_tree
+
+            old_shading_node_name = f"ShadingRigEffect_{old_empty_name}"
+            new_shading_node_name = f"ShadingRigEffect_{current_empty_name}"
+            shading_node = node_tree.nodes.get(old_shading_node_name)
+            if shading_node:
+                shading_node.name = new_shading_node_name
+                shading_node.label = new_shading_node_name
+
+            old_mix_node_name = f"MixRGB_{old_empty_name}"
+            new_mix_node_name = f"MixRGB_{current_empty_name}"
+            mix_node = node_tree.nodes.get(old_mix_node_name)
+            if mix_node:
+                mix_node.name = new_mix_node_name
+                mix_node.label = new_mix_node_name
+
+            sr_param_texture.rename_texture_nodes(
+                node_tree,
+                f"{sr_packing.PACKED_PROPERTY_PREFIX}{old_empty_name}",
+                f"{sr_packing.PACKED_PROPERTY_PREFIX}{current_empty_name}",
+            )
+
+    if rig_item.last_empty_name != current_empty_name:
+        rig_item.last_empty_name = current_empty_name
+
+
+def evaluate_live_rigs(scene, depsgraph, addon_prefs):
+    """
+    Handles automatic updates for the Shading Rig system.
+    1. Detects renames of Empty objects and syncs shader node names.
+    2. Interpolates Empty transform based on Light rotation.
+    Only rigs whose light actually moved are evaluated, and each light
+    is only looked at once no matter how many rigs it drives.
+    """
+    global _last_frame, _last_link_generation
+
+    frame = scene.frame_current
+    # Links or interpolation settings changed- re-evaluate even if lights haven't moved
+    links_changed = sr_link_cache.get_generation() != _last_link_generation
+    # Not every version lists animated objects in depsgraph.updates on frame change
+    # (and switching scenes is as good as a frame change)
+    check_all_lights = links_changed or (scene.session_uid, frame) != _last_frame
+    _last_frame = (scene.session_uid, frame)
+    _last_link_generation = sr_link_cache.get_generation()
+
+    profiling = addon_prefs.use_profiling
+    if not addon_prefs.use_deferred_evaluation and _dirty_rigs:
+        # Deferred mode was just turned off- finish what it had queued
+        flush_dirty_rigs(addon_prefs)
+
+    updated_lights = get_updated_lights(depsgraph)
+    rig_list = scene.shading_rig_list
+    light_index = get_light_index(scene)
+    previous_light_transforms = get_scene_light_transforms(scene)
+
+    evaluated_count = 0
+    cached_count = 0
+    skipped_count = 0
+
+    for rig_item in rig_list:
+        if rig_item.empty_object:
+            sync_empty_rename(rig_item)
+        elif addon_prefs.debug_mode:
+            print(
+                f"Shading Rig Debug: Skipping rig '{rig_item.name}' - no Empty object assigned."
+            )
+
+    # Rigs with no light never make it into the index
+    skipped_count += len(rig_list) - sum(len(rigs) for rigs in light_index.values())
+
+    pending_rigs = []
+    results = []
+    light_transforms = {}
+    for light_uid, rig_indices in light_index.items():
+        if (
+            not check_all_lights
+            and light_uid not in updated_lights
+            and light_uid in previous_light_transforms
+        ):
+            # Something else changed (sculpting, moving a prop...)
+            skipped_count += len(rig_indices)
+            continue
+
+        light_obj = rig_list[rig_indices[0]].light_object
+        eval_light_obj = light_obj.evaluated_get(depsgraph)
+        if not eval_light_obj:
+            if addon_prefs.debug_mode:
+                print(
+                    f"Shading Rig Debug: Skipping light '{light_obj.name}' - could not get evaluated light object from depsgraph."
+                )
+            skipped_count += len(rig_indices)
+            continue
+
+        current_light_rotation = eval_light_obj.rotation_euler
+        current_light_position = eval_light_obj.location
+
+        prev_transform = previous_light_transforms.get(light_uid)
+        if prev_transform and not links_changed:
+            # make a 6 digit list combining XYZ rotation and XYZ position
+            rot_pos = list(prev_transform[0]) + list(prev_transform[1])
+            # check the distance between the two 6 digit lists
+            curr_rot_pos = list(current_light_rotation) + list(current_light_position)
+            # Use a more reasonable threshold for detecting changes (0.001 instead of 1e-5)
+            if all(abs(a - b) < 0.001 for a, b in zip(rot_pos, curr_rot_pos)):
+                skipped_count += len(rig_indices)
+                continue
+
+        light_rotation = current_light_rotation.copy()
+        light_position = current_light_position.copy()
+        light_quaternion = tuple(light_rotation.to_quaternion())
+        light_transforms[light_uid] = [light_rotation, light_position]
+
+        for rig_index in rig_indices:
+            rig_item = rig_list[rig_index]
+            empty_obj = rig_item.empty_object
+            if not empty_obj or rig_item.is_baked:
+                # Baked rigs are driven by their keyframes now
+                skipped_count += 1
+                continue
+            if len(rig_item.links) == 0 and addon_prefs.debug_mode:
+                skipped_count += 1
+                continue
+
+            rig_key = sr_link_cache.get_rig_key(rig_item)
+
+            # Seen this frame with this light before? (looping playback)
+            if addon_prefs.use_frame_cache:
+                lookup_start = time.perf_counter()
+                cached = sr_frame_cache.lookup(
+                    rig_key, frame, light_rotation, light_position
+                )
+                if cached:
+                    # Anything still queued for this rig is older than this
+                    _dirty_rigs.pop(rig_key, None)
+                    cached_count += 1
+                    results.append((empty_obj, cached))
+                    if profiling:
+                        sr_profiler.record_rig(
+                            rig_key, time.perf_counter() - lookup_start
+                        )
+                    continue
+
+            # Don't evaluate yet- collect everything and do all rigs in one pass
+            pending_rigs.append(
+                (
+                    rig_item,
+                    empty_obj,
+                    rig_key,
+                    light_rotation,
+                    light_position,
+                    light_quaternion,
+                )
+            )
+
+    queued_count = 0
+    if pending_rigs and addon_prefs.use_deferred_evaluation:
+        # Leave the blending to the timer, so dragging a light stays responsive
+        queue_pending_rigs(scene, frame, pending_rigs)
+        queued_count = len(pending_rigs)
+    elif pending_rigs:
+        results.extend(evaluate_pending_rigs(pending_rigs, frame, addon_prefs))
+        evaluated_count = len(pending_rigs)
+
+    written_count = write_results(results)
+
+    previous_light_transforms.update(light_transforms)
+
+    handler_stats["evaluated"] = evaluated_count
+    handler_stats["cached"] = cached_count
+    handler_stats["skipped"] = skipped_count
+    handler_stats["written"] = written_count
+    handler_stats["queued"] = queued_count
+
+    if addon_prefs.debug_mode and (evaluated_count or cached_count or queued_count):
+        print(
+            f"Shading Rig Debug: Evaluated {evaluated_count}, replayed {cached_count} "
+            f"from cache, queued {queued_count}, skipped {skipped_count} rig(s), "
+            f"wrote {written_count}"
+        )
+
+
+def evaluate_pending_rigs(pending_rigs, frame, addon_prefs):
+    """
+    Blends every pending rig in one batch and caches the results.
+    pending_rigs are (rig_item, empty_obj, rig_key, light_rotation,
+    light_position, light_quaternion); returns [(empty_obj, result)].
+    """
+    evaluate_start = time.perf_counter()
+    try:
+        weighted_positions, weighted_scales, weighted_rotations = (
+            sr_link_cache.evaluate_rigs(
+                [pending[0] for pending in pending_rigs],
+                [pending[3] for pending in pending_rigs],
+                [pending[4] for pending in pending_rigs],
+                [pending[5] for pending in pending_rigs],
+            )
+        )
+    except Exception as e:
+        if addon_prefs.debug_mode:
+            print(f"Shading Rig Debug: Error evaluating shading rigs: {e}")
+        return []
+    evaluate_time = time.perf_counter() - evaluate_start
+
+    if addon_prefs.use_profiling:
+        # All rigs are blended in one batch, so each gets the
+        # share of it its links account for
+        link_counts = [max(1, len(pending[0].links)) for pending in pending_rigs]
+        total_links = sum(link_counts)
+        for pending, link_count in zip(pending_rigs, link_counts):
+            sr_profiler.record_rig(pending[2], evaluate_time * link_count / total_links)
+
+    results = []
+    for i, (_, empty_obj, rig_key, light_rotation, light_position, _) in enumerate(
+        pending_rigs
+    ):
+        result = (
+            tuple(weighted_positions[i]),
+            tuple(weighted_scales[i]),
+            tuple(weighted_rotations[i]),
+        )
+        if addon_prefs.use_frame_cache:
+            sr_frame_cache.store(rig_key, frame, light_rotation, light_position, result)
+        results.append((empty_obj, result))
+    return results
+
+
+# ---------------------------------------------------------------------------- #
+#                  Deferred mode: blend on a timer, within budget               #
+# ---------------------------------------------------------------------------- #
+
+# Dragging a light fires the handler many times per redraw. In deferred mode
+# the handler only queues the rigs that need blending; a timer then works
+# through the queue a few times a second, stopping each tick once its
+# millisecond budget is spent and carrying the rest over to the next tick.
+# Empties can lag a frame behind while dragging, but the viewport stays
+# interactive with hundreds of effects.
+
+# rig key -> (scene name, rig index, frame, light rotation, position, quaternion)
+# Re-queuing a rig just replaces its light transform with the newest one.
+_dirty_rigs = OrderedDict()
+
+# Rigs blended per batch inside a tick; small enough to stop close to the budget
+DEFERRED_CHUNK_SIZE = 16
+
+
+def queue_pending_rigs(scene, frame, pending_rigs):
+    """Marks rigs dirty for the deferred timer, and makes sure it's running."""
+    rig_list = scene.shading_rig_list
+    rig_indices = {
+        sr_link_cache.get_rig_key(rig_item): i for i, rig_item in enumerate(rig_list)
+    }
+    for rig_item, _, rig_key, light_rotation, light_position, light_quaternion in (
+        pending_rigs
+    ):
+        _dirty_rigs[rig_key] = (
+            scene.name,
+            rig_indices.get(rig_key, -1),
+            frame,
+            light_rotation,
+            light_position,
+            light_quaternion,
+        )
+        _dirty_rigs.move_to_end(rig_key)
+
+    if not bpy.app.timers.is_registered(deferred_evaluation_timer):
+        bpy.app.timers.register(deferred_evaluation_timer, first_interval=0.0)
+
+
+def get_dirty_rig_count():
+    return len(_dirty_rigs)
+
+
+def clear_dirty_rigs():
+    """Drops everything queued (file load, undo, leaving live mode)."""
+    _dirty_rigs.clear()
+
+
+def _evaluate_dirty_chunk(addon_prefs):
+    """Blends and writes the next chunk of the queue. Returns (evaluated, written)."""
+    evaluated_count = 0
+    written_count = 0
+    for frame, pending_rigs in _take_dirty_chunk(DEFERRED_CHUNK_SIZE).items():
+        results = evaluate_pending_rigs(pending_rigs, frame, addon_prefs)
+        evaluated_count += len(results)
+        written_count += write_results(results)
+    return evaluated_count, written_count
+
+
+def flush_dirty_rigs(addon_prefs):
+    """Blends everything still queued right now, ignoring the budget."""
+    while _dirty_rigs:
+        _evaluate_dirty_chunk(addon_prefs)
+    if bpy.app.timers.is_registered(deferred_evaluation_timer):
+        bpy.app.timers.unregister(deferred_evaluation_timer)
+
+
+def stop_deferred_evaluation():
+    clear_dirty_rigs()
+    if bpy.app.timers.is_registered(deferred_evaluation_timer):
+        bpy.app.timers.unregister(deferred_evaluation_timer)
+
+
+def _resolve_dirty_rig(rig_key, scene_name, rig_index):
+    """Finds a queued rig again; the list may have changed since it was queued."""
+    scene = bpy.data.scenes.get(scene_name)
+    if not scene:
+        return None
+    rig_list = scene.shading_rig_list
+    if 0 <= rig_index < len(rig_list):
+        rig_item = rig_list[rig_index]
+        if sr_link_cache.get_rig_key(rig_item) == rig_key:
+            return rig_item
+    for rig_item in rig_list:
+        if sr_link_cache.get_rig_key(rig_item) == rig_key:
+            return rig_item
+    return None
+
+
+def _take_dirty_chunk(chunk_size):
+    """Pops up to chunk_size queued rigs as pending_rigs tuples, per frame."""
+    chunks = {}
+    taken = 0
+    while _dirty_rigs and taken < chunk_size:
+        rig_key, queued = _dirty_rigs.popitem(last=False)
+        taken += 1
+        scene_name, rig_index, frame, light_rotation, light_position, light_quaternion = (
+            queued
+        )
+        rig_item = _resolve_dirty_rig(rig_key, scene_name, rig_index)
+        if not rig_item or not rig_item.empty_object or rig_item.is_baked:
+            continue
+        chunks.setdefault(frame, []).append(
+            (
+                rig_item,
+                rig_item.empty_object,
+                rig_key,
+                light_rotation,
+                light_position,
+                light_quaternion,
+            )
+        )
+    return chunks
+
+
+def deferred_evaluation_timer():
+    """
+    bpy.app.timers callback: blends queued rigs until the tick's budget
+    is spent. Returns the delay until the next tick, or None once the
+    queue is empty (which unregisters it).
+    """
+    addon_prefs = bpy.context.preferences.addons[
+        "shading-rig-and-cel-character-tools"
+    ].preferences
+    if not bpy.types.Scene.is_evaluating_shading_rig:
+        # Went back to edit mode, the empties belong to the links now
+        clear_dirty_rigs()
+        return None
+
+    tick_start = time.perf_counter()
+    budget = addon_prefs.deferred_budget_ms / 1000.0
+    evaluated_count = 0
+    written_count = 0
+    # Always do at least one chunk, so a tiny budget still makes progress
+    while _dirty_rigs:
+        chunk_evaluated, chunk_written = _evaluate_dirty_chunk(addon_prefs)
+        evaluated_count += chunk_evaluated
+        written_count += chunk_written
+        if time.perf_counter() - tick_start >= budget:
+            break
+
+    if addon_prefs.use_profiling and evaluated_count:
+        sr_profiler.record_invocation(
+            "TIMER",
+            time.perf_counter() - tick_start,
+            {
+                "evaluated": evaluated_count,
+                "written": written_count,
+                "queued": len(_dirty_rigs),
+            },
+        )
+    if addon_prefs.debug_mode and evaluated_count:
+        print(
+            f"Shading Rig Debug: Deferred tick blended {evaluated_count} rig(s), "
+            f"{len(_dirty_rigs)} left for the next tick"
+        )
+
+    if not _dirty_rigs:
+        return None
+    return 1.0 / max(1, addon_prefs.deferred_tick_rate)
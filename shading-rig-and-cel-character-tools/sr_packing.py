@@ -0,0 +1,357 @@
+import bpy
+
+from . import hansens_float_packer, sr_param_texture
+
+# ---------------------------------------------------------------------------- #
+#                        Getting packed values to objects                      #
+# ---------------------------------------------------------------------------- #
+
+# Each effect's settings are packed into a packed:<name> custom property
+# the material's decode nodes read. There are four ways to keep it up to
+# date, picked per scene with shading_rig_packing_mode:
+#
+# DRIVERS: every object using the effect's material has the property, with
+#   3 scripted drivers calling bpy.packing_algorithm. Needs auto-run scripts
+#   and a working driver namespace, and every driver runs Python on every
+#   depsgraph pass.
+# PUSH: every object has the property, but no drivers. Changing an effect
+#   packs it once and writes the value to every object using its material
+#   in one go.
+# SCENE: the property is on the scene, once per effect, and the Attribute
+#   node is a View Layer attribute (which looks in the view layer, then the
+#   scene). An effect's settings are the same for every object anyway, so
+#   this costs the same however many objects share the material.
+# TEXTURE: the values are rows of one float image per character, sampled by
+#   an Image Texture node instead of an Attribute node (see
+#   sr_param_texture).
+
+# This order MUST match node_helpers.create_mode_mix_nodes
+BLEND_MODE_IDENTIFIERS = ("LIGHTEN", "SUBTRACT", "MULTIPLY", "DARKEN", "ADD")
+
+PACKED_PROPERTY_PREFIX = "packed:"
+
+# The effect properties packing_algorithm takes, in order
+DRIVER_VARIABLES = (
+    "elongation",
+    "sharpness",
+    "bulge",
+    "bend",
+    "hardness",
+    "mode",
+    "clamp",
+    "rotation",
+)
+
+PACKING_MODE_ITEMS = [
+    (
+        "DRIVERS",
+        "Drivers",
+        "Each object's packed values are driven by Python drivers (needs auto-run scripts)",
+    ),
+    (
+        "PUSH",
+        "Push",
+        "Packed values are written to the objects whenever an effect changes, with no drivers",
+    ),
+    (
+        "SCENE",
+        "Scene",
+        "One packed value per effect on the scene, read with View Layer attributes. Nothing is stored on the objects",
+    ),
+    (
+        "TEXTURE",
+        "Texture",
+        "Every effect's packed value in one float image, sampled by effect. No Attribute nodes, so no limit on effects per material",
+    ),
+]
+
+
+def use_push_packing(scene):
+    """Whether the addon writes packed values itself, rather than drivers."""
+    return scene.shading_rig_packing_mode in {"PUSH", "SCENE", "TEXTURE"}
+
+
+def get_attribute_type(scene):
+    """What the effect's Attribute node should look the packed value up on."""
+    if scene.shading_rig_packing_mode == "SCENE":
+        return "VIEW_LAYER"
+    return "OBJECT"
+
+
+def find_attribute_node(node_tree, packed_prop_name):
+    for node in node_tree.nodes:
+        if (
+            node.bl_idname == "ShaderNodeAttribute"
+            and node.attribute_name == packed_prop_name
+        ):
+            return node
+    return None
+
+
+def set_packed_source(rig_item, row, image=None):
+    """
+    Makes the effect's decode nodes read the packed value from wherever the
+    scene's packing mode puts it: an Attribute node (objects or view layer),
+    or row of image in Texture mode. Swaps the node feeding them if needed.
+    """
+    material = rig_item.material
+    if not (rig_item.added_to_material and material and material.node_tree):
+        return
+
+    scene = rig_item.id_data
+    node_tree = material.node_tree
+    packed_prop_name = get_packed_property_name(rig_item)
+    attribute_node = find_attribute_node(node_tree, packed_prop_name)
+    texture_node = node_tree.nodes.get(
+        sr_param_texture.get_texture_node_names(packed_prop_name)[0]
+    )
+    if texture_node and texture_node.outputs[0].is_linked:
+        current_node = texture_node
+    else:
+        current_node = attribute_node
+    if current_node is None:
+        # Nothing to swap, someone's rebuilt the nodes by hand
+        return
+
+    if scene.shading_rig_packing_mode == "TEXTURE":
+        if texture_node is None:
+            texture_node = sr_param_texture.add_texture_nodes(
+                node_tree,
+                image,
+                packed_prop_name,
+                row,
+                len(scene.shading_rig_list),
+                current_node.location.copy(),
+            )
+        else:
+            sr_param_texture.set_texture_row(
+                node_tree, packed_prop_name, row, len(scene.shading_rig_list), image
+            )
+        source_node = texture_node
+    else:
+        if attribute_node is None:
+            attribute_node = node_tree.nodes.new("ShaderNodeAttribute")
+            attribute_node.attribute_name = packed_prop_name
+            attribute_node.label = packed_prop_name
+            attribute_node.location = current_node.location.copy()
+        attribute_node.attribute_type = get_attribute_type(scene)
+        source_node = attribute_node
+
+    if source_node is current_node:
+        return
+    for link in list(current_node.outputs[0].links):
+        node_tree.links.new(source_node.outputs[0], link.to_socket)
+    if current_node is texture_node:
+        sr_param_texture.remove_texture_nodes(node_tree, packed_prop_name)
+    else:
+        node_tree.nodes.remove(current_node)
+
+
+def update_param_texture(scene):
+    """
+    Rewrites the scene's parameter image from every effect, and points each
+    effect at its row (rows move when effects are removed). Returns the image.
+    """
+    rig_list = scene.shading_rig_list
+    image = sr_param_texture.write_param_image(scene, pack_rigs(rig_list))
+    for row, rig_item in enumerate(rig_list):
+        material = rig_item.material
+        if not (material and material.node_tree):
+            continue
+        if not sr_param_texture.set_texture_row(
+            material.node_tree,
+            get_packed_property_name(rig_item),
+            row,
+            len(rig_list),
+            image,
+        ):
+            # Still reading an Attribute node
+            set_packed_source(rig_item, row, image)
+    return image
+
+
+def rebuild_param_textures():
+    """
+    Rewrites the parameter image of every scene in Texture mode. Generated
+    images aren't saved with the file (and packing one would make it an 8 bit
+    PNG), so this has to run before anything samples them.
+    Returns how many images were written.
+    """
+    rebuilt = 0
+    for scene in bpy.data.scenes:
+        if scene.shading_rig_packing_mode == "TEXTURE" and scene.shading_rig_list:
+            update_param_texture(scene)
+            rebuilt += 1
+    return rebuilt
+
+
+def _rebuild_param_textures_timer():
+    # bpy.data can't be read while the addon is registering at startup
+    rebuild_param_textures()
+    return None
+
+
+def start_param_texture_rebuild():
+    if not bpy.app.timers.is_registered(_rebuild_param_textures_timer):
+        bpy.app.timers.register(_rebuild_param_textures_timer, first_interval=0.0)
+
+
+def stop_param_texture_rebuild():
+    if bpy.app.timers.is_registered(_rebuild_param_textures_timer):
+        bpy.app.timers.unregister(_rebuild_param_textures_timer)
+
+
+def get_packed_property_name(rig_item):
+    """The custom property the effect's Attribute node reads."""
+    if rig_item.empty_object:
+        return f"{PACKED_PROPERTY_PREFIX}{rig_item.empty_object.name}"
+    return f"{PACKED_PROPERTY_PREFIX}{rig_item.name}"
+
+
+def get_objects_with_material(material):
+    if material is None:
+        return []
+    return [
+        obj
+        for obj in bpy.data.objects
+        if any(s.material == material for s in obj.material_slots)
+    ]
+
+
+def add_packing_drivers(obj, packed_prop_name, rig_index):
+    """Drives obj[packed_prop_name] from shading_rig_list[rig_index]."""
+    obj[packed_prop_name] = [0, 0, 0]
+
+    # Create drivers for each channel (0=red, 1=green, 2=blue)
+    for channel in range(3):
+        fcurve = obj.driver_add(f'["{packed_prop_name}"]', channel)
+        driver = fcurve.driver
+        driver.type = "SCRIPTED"
+
+        # Create input variables as Context Properties
+        for var_name in DRIVER_VARIABLES:
+            var = driver.variables.new()
+            var.name = var_name
+            var.type = "CONTEXT_PROP"
+            var.targets[0].context_property = "ACTIVE_SCENE"
+            var.targets[0].data_path = f"shading_rig_list[{rig_index}].{var_name}"
+
+        # Set the expression to use the input variables
+        driver.expression = (
+            f"bpy.packing_algorithm("
+            f"{', '.join(DRIVER_VARIABLES)})[{channel}]"
+        )
+
+
+def remove_packing_drivers(obj, packed_prop_name):
+    """Removes the drivers, leaving the property with its last value."""
+    if packed_prop_name not in obj:
+        return
+    try:
+        obj.driver_remove(f'["{packed_prop_name}"]')
+    except TypeError:
+        # Never had any
+        pass
+
+
+def pack_rigs(rig_items):
+    """Packs every rig item's effect settings at once. Returns an (N, 3) array."""
+    return hansens_float_packer.pack_many(
+        [rig_item.elongation for rig_item in rig_items],
+        [rig_item.sharpness for rig_item in rig_items],
+        [rig_item.bulge for rig_item in rig_items],
+        [rig_item.bend for rig_item in rig_items],
+        [rig_item.hardness for rig_item in rig_items],
+        [BLEND_MODE_IDENTIFIERS.index(rig_item.mode) for rig_item in rig_items],
+        [rig_item.clamp for rig_item in rig_items],
+        [rig_item.rotation for rig_item in rig_items],
+    )
+
+
+def _write_packed_value(id_block, packed_prop_name, values):
+    """Returns True if the value changed."""
+    if packed_prop_name in id_block and list(id_block[packed_prop_name]) == values:
+        return False
+    id_block[packed_prop_name] = values
+    return True
+
+
+def push_packed_values(rig_items):
+    """
+    Packs the rig items and writes the values to their scene (Scene mode),
+    their scene's parameter image (Texture mode) or every object using their
+    materials (Push mode). Objects and scenes whose values haven't changed
+    are left alone, so nothing re-renders for them.
+    Returns how many objects/scenes/images were written.
+    """
+    rig_items = [rig_item for rig_item in rig_items if rig_item.material]
+    if not rig_items:
+        return 0
+
+    packed = pack_rigs(rig_items)
+    objects_by_material = {}
+    texture_scenes = {}
+    updated_ids = set()
+    for rig_item, values in zip(rig_items, packed):
+        packed_prop_name = get_packed_property_name(rig_item)
+        values = values.tolist()
+
+        # Rig items live in the scene's shading_rig_list
+        scene = rig_item.id_data
+        if scene.shading_rig_packing_mode == "TEXTURE":
+            # The whole image is rewritten at once, below
+            texture_scenes[scene.name] = scene
+            continue
+        if scene.shading_rig_packing_mode == "SCENE":
+            if _write_packed_value(scene, packed_prop_name, values):
+                updated_ids.add(scene)
+            continue
+
+        material = rig_item.material
+        if material.name not in objects_by_material:
+            objects_by_material[material.name] = get_objects_with_material(material)
+        for obj in objects_by_material[material.name]:
+            if _write_packed_value(obj, packed_prop_name, values):
+                updated_ids.add(obj)
+
+    for scene in texture_scenes.values():
+        updated_ids.add(update_param_texture(scene))
+
+    # Custom property writes don't tag anything on their own
+    for id_block in updated_ids:
+        id_block.update_tag()
+    return len(updated_ids)
+
+
+def apply_packing_mode(scene):
+    """Moves every effect in the scene over to the scene's packing mode."""
+    rig_list = scene.shading_rig_list
+    packing_mode = scene.shading_rig_packing_mode
+    image = None
+    if packing_mode == "TEXTURE":
+        image = sr_param_texture.write_param_image(scene, pack_rigs(rig_list))
+
+    for rig_index, rig_item in enumerate(rig_list):
+        packed_prop_name = get_packed_property_name(rig_item)
+        for obj in get_objects_with_material(rig_item.material):
+            # Drivers are rebuilt too, in case effects above were removed
+            remove_packing_drivers(obj, packed_prop_name)
+            if packing_mode == "DRIVERS":
+                add_packing_drivers(obj, packed_prop_name, rig_index)
+            elif packing_mode in {"SCENE", "TEXTURE"} and packed_prop_name in obj:
+                del obj[packed_prop_name]
+        if packing_mode != "SCENE":
+            remove_scene_value(scene, packed_prop_name)
+        set_packed_source(rig_item, rig_index, image)
+
+    if packing_mode != "TEXTURE":
+        image = bpy.data.images.get(sr_param_texture.get_param_image_name(scene))
+        if image:
+            bpy.data.images.remove(image)
+    if use_push_packing(scene):
+        push_packed_values(rig_list)
+
+
+def remove_scene_value(scene, packed_prop_name):
+    if packed_prop_name in scene:
+        del scene[packed_prop_name]
@@ -0,0 +1,122 @@
+import bpy
+import numpy as np
+from mathutils import Vector
+
+# ---------------------------------------------------------------------------- #
+#                        Effect parameter texture atlas                        #
+# ---------------------------------------------------------------------------- #
+
+# Texture packing mode: every effect's packed RGB lives in one row of a small
+# float image per character, written in one go with foreach_set. Each effect's
+# Image Texture node samples its own row, in place of the Attribute node, and
+# feeds the same decode nodes. There's no per-object data or drivers, and no
+# Attribute nodes counting towards the material's limit.
+#
+# The packed values go up to 9,999,999, which float32 holds exactly but half
+# floats don't, so the image is full float on the GPU too. Generated images
+# aren't saved with the file, and packing one would save it as an 8 bit PNG,
+# so it's rebuilt from the effects when the addon registers, on load and
+# before every render (see sr_packing.rebuild_param_textures).
+
+PARAM_IMAGE_PREFIX = "ShadingRigParams_"
+
+
+def get_param_image_name(scene):
+    character_name = scene.shading_rig_chararacter_name or scene.name
+    return f"{PARAM_IMAGE_PREFIX}{character_name}"
+
+
+def get_param_image(scene, row_count):
+    """The scene's parameter image, created or resized for row_count effects."""
+    row_count = max(1, row_count)
+    image_name = get_param_image_name(scene)
+    image = bpy.data.images.get(image_name)
+    if image is None:
+        image = bpy.data.images.new(
+            image_name, width=1, height=row_count, alpha=True, float_buffer=True
+        )
+    elif tuple(image.size) != (1, row_count):
+        image.scale(1, row_count)
+
+    # These are numbers, not colors
+    image.colorspace_settings.name = "Non-Color"
+    image.alpha_mode = "CHANNEL_PACKED"
+    image.use_half_precision = False
+    return image
+
+
+def write_param_image(scene, packed):
+    """Writes an (N, 3) packed array as the scene's parameter image, one row per effect."""
+    image = get_param_image(scene, len(packed))
+    pixels = np.ones((max(1, len(packed)), 4), dtype=np.float32)
+    pixels[: len(packed), :3] = packed
+    image.pixels.foreach_set(pixels.ravel())
+    image.update()
+    return image
+
+
+def get_row_coordinate(row, row_count):
+    """Texture V of the middle of a row, so Closest sampling lands on it."""
+    return (row + 0.5) / max(1, row_count)
+
+
+def get_texture_node_names(packed_prop_name):
+    return f"{packed_prop_name}_Texture", f"{packed_prop_name}_Row"
+
+
+def set_texture_row(node_tree, packed_prop_name, row, row_count, image=None):
+    """
+    Points an effect's Image Texture node at its row (and image, if given,
+    since renaming the character makes a new one).
+    Returns False if it has none.
+    """
+    texture_node_name, row_node_name = get_texture_node_names(packed_prop_name)
+    texture_node = node_tree.nodes.get(texture_node_name)
+    row_node = node_tree.nodes.get(row_node_name)
+    if texture_node is None or row_node is None:
+        return False
+    if image is not None and texture_node.image != image:
+        texture_node.image = image
+    row_node.inputs[1].default_value = get_row_coordinate(row, row_count)
+    return True
+
+
+def add_texture_nodes(node_tree, image, packed_prop_name, row, row_count, location):
+    """An Image Texture node reading one row of image. Returns the texture node."""
+    texture_node_name, row_node_name = get_texture_node_names(packed_prop_name)
+
+    row_node = node_tree.nodes.new("ShaderNodeCombineXYZ")
+    row_node.name = row_node_name
+    row_node.label = row_node_name
+    row_node.inputs[0].default_value = 0.5
+    row_node.location = location - Vector((200, 0))
+
+    texture_node = node_tree.nodes.new("ShaderNodeTexImage")
+    texture_node.name = texture_node_name
+    texture_node.label = texture_node_name
+    texture_node.image = image
+    texture_node.interpolation = "Closest"
+    texture_node.extension = "EXTEND"
+    texture_node.location = location
+    node_tree.links.new(row_node.outputs[0], texture_node.inputs[0])
+
+    set_texture_row(node_tree, packed_prop_name, row, row_count)
+    return texture_node
+
+
+def remove_texture_nodes(node_tree, packed_prop_name):
+    for node_name in get_texture_node_names(packed_prop_name):
+        node = node_tree.nodes.get(node_name)
+        if node:
+            node_tree.nodes.remove(node)
+
+
+def rename_texture_nodes(node_tree, old_packed_prop_name, new_packed_prop_name):
+    for old_name, new_name in zip(
+        get_texture_node_names(old_packed_prop_name),
+        get_texture_node_names(new_packed_prop_name),
+    ):
+        node = node_tree.nodes.get(old_name)
+        if node:
+            node.name = new_name
+            node.label = new_name
@@ -0,0 +1,194 @@
+import csv
+import json
+import time
+from collections import deque
+
+# ---------------------------------------------------------------------------- #
+#                         Shading rig handler profiling                        #
+# ---------------------------------------------------------------------------- #
+
+# Rolling record of what update_shading_rig_handler costs. Only recorded when
+# "Profile Shading Rig Handler" is on in the preferences, and cheap enough to
+# leave on (no printing, just a few appends per update).
+
+DEFAULT_HISTORY_SIZE = 500
+
+# Histogram bucket upper bounds in milliseconds; anything slower goes in the last one
+HISTOGRAM_BOUNDS_MS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 25.0, 50.0, 100.0)
+
+INVOCATION_FIELDS = (
+    "timestamp",
+    "mode",
+    "duration_ms",
+    "evaluated",
+    "cached",
+    "skipped",
+    "written",
+    "queued",
+)
+
+_history_size = DEFAULT_HISTORY_SIZE
+_invocations = deque(maxlen=_history_size)
+_rig_timings = {}
+# Handler calls dropped by the re-entrancy guard or as our own echo
+_ignored_count = 0
+
+
+def set_history_size(history_size):
+    """Changes how many invocations (and timings per rig) are kept."""
+    global _history_size, _invocations
+    _history_size = max(1, int(history_size))
+    _invocations = deque(_invocations, maxlen=_history_size)
+    for rig_name in list(_rig_timings):
+        _rig_timings[rig_name] = deque(_rig_timings[rig_name], maxlen=_history_size)
+
+
+def reset():
+    global _ignored_count
+    _invocations.clear()
+    _rig_timings.clear()
+    _ignored_count = 0
+
+
+def get_rig_name(rig_key):
+    """Readable name for a sr_link_cache rig key."""
+    return "/".join(rig_key)
+
+
+def record_invocation(mode, duration, stats=None):
+    """
+    Records one handler run. duration is in seconds, stats is a
+    sr_live_update.handler_stats style dict (edit mode has none).
+    """
+    stats = stats or {}
+    _invocations.append(
+        {
+            "timestamp": time.time(),
+            "mode": mode,
+            "duration_ms": duration * 1000.0,
+            "evaluated": stats.get("evaluated", 0),
+            "cached": stats.get("cached", 0),
+            "skipped": stats.get("skipped", 0),
+            "written": stats.get("written", 0),
+            "queued": stats.get("queued", 0),
+        }
+    )
+
+
+def record_rig(rig_key, duration):
+    """Records how long one rig took in a live update, in seconds."""
+    rig_name = get_rig_name(rig_key)
+    timings = _rig_timings.get(rig_name)
+    if timings is None:
+        timings = _rig_timings[rig_name] = deque(maxlen=_history_size)
+    timings.append(duration * 1000.0)
+
+
+def record_ignored():
+    global _ignored_count
+    _ignored_count += 1
+
+
+def get_invocations():
+    return list(_invocations)
+
+
+def get_ignored_count():
+    return _ignored_count
+
+
+def _percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def summarize(durations):
+    """count/mean/p50/p95/max of a list of millisecond timings."""
+    durations = sorted(durations)
+    if not durations:
+        return {"count": 0, "mean_ms": 0.0, "p50_ms": 0.0, "p95_ms": 0.0, "max_ms": 0.0}
+    return {
+        "count": len(durations),
+        "mean_ms": sum(durations) / len(durations),
+        "p50_ms": _percentile(durations, 0.5),
+        "p95_ms": _percentile(durations, 0.95),
+        "max_ms": durations[-1],
+    }
+
+
+def get_summary():
+    summary = summarize([inv["duration_ms"] for inv in _invocations])
+    for field in ("evaluated", "cached", "skipped", "written"):
+        summary[field] = sum(inv[field] for inv in _invocations)
+    summary["ignored"] = _ignored_count
+    return summary
+
+
+def get_histogram():
+    """
+    Returns [(upper bound in ms, count)] over the recorded invocations.
+    The last bucket's bound is None (slower than every other bucket).
+    """
+    counts = [0] * (len(HISTOGRAM_BOUNDS_MS) + 1)
+    for inv in _invocations:
+        bucket = len(HISTOGRAM_BOUNDS_MS)
+        for i, bound in enumerate(HISTOGRAM_BOUNDS_MS):
+            if inv["duration_ms"] <= bound:
+                bucket = i
+                break
+        counts[bucket] += 1
+    return list(zip(HISTOGRAM_BOUNDS_MS + (None,), counts))
+
+
+def get_rig_summaries():
+    """{rig name: summary}, slowest (by mean) first."""
+    summaries = {
+        rig_name: summarize(timings) for rig_name, timings in _rig_timings.items()
+    }
+    return dict(
+        sorted(summaries.items(), key=lambda item: item[1]["mean_ms"], reverse=True)
+    )
+
+
+def export_json(filepath):
+    data = {
+        "summary": get_summary(),
+        "histogram": [
+            {"le_ms": bound, "count": count} for bound, count in get_histogram()
+        ],
+        "rigs": get_rig_summaries(),
+        "invocations": get_invocations(),
+    }
+    with open(filepath, "w") as f:
+        json.dump(data, f, indent=2)
+
+
+def export_csv(filepath):
+    """
+    Writes the invocations to filepath, and the per-rig summaries
+    next to it as <name>_rigs.csv.
+    """
+    with open(filepath, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=INVOCATION_FIELDS)
+        writer.writeheader()
+        writer.writerows(_invocations)
+
+    base = filepath[:-4] if filepath.lower().endswith(".csv") else filepath
+    rigs_filepath = f"{base}_rigs.csv"
+    with open(rigs_filepath, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["rig", "count", "mean_ms", "p50_ms", "p95_ms", "max_ms"])
+        for rig_name, summary in get_rig_summaries().items():
+            writer.writerow(
+                [
+                    rig_name,
+                    summary["count"],
+                    summary["mean_ms"],
+                    summary["p50_ms"],
+                    summary["p95_ms"],
+                    summary["max_ms"],
+                ]
+            )
+    return rigs_filepath
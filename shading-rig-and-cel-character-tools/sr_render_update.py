@@ -0,0 +1,172 @@
+import bpy
+import numpy as np
+from bpy.app.handlers import persistent
+
+from . import bake_helpers, sr_link_cache, sr_live_update, sr_packing
+
+# ---------------------------------------------------------------------------- #
+#                   Render/background mode: evaluate per frame                 #
+# ---------------------------------------------------------------------------- #
+
+# depsgraph_update_post isn't a reliable way to place the Empties before a
+# frame renders, especially with `blender -b`. While rendering (or in the
+# background) every rig is evaluated once per frame from frame_change_pre
+# instead, before the depsgraph is evaluated for that frame, so the render
+# always sees this frame's Empties. Nothing here touches preferences, the UI
+# or debug printing.
+#
+# Before the depsgraph runs, a light's transform for the new frame can only
+# be read from its F-Curves. Lights moved by drivers or NLA are evaluated in
+# frame_change_post from the evaluated depsgraph instead, and the depsgraph
+# is then updated again so the frame renders with those Empties too.
+
+_rendering = False
+# (scene, frame) the pre pass last ran for, so render_pre doesn't repeat it
+_evaluated_frame = None
+
+
+def should_evaluate():
+    """The per-frame path takes over from the live handler in these cases."""
+    return _rendering or bpy.app.background
+
+
+def get_render_rigs(scene):
+    """Every effect the live update would move, minus the baked ones."""
+    return [
+        rig_item
+        for rig_item in bake_helpers.get_bakeable_rigs(scene)
+        if not rig_item.is_baked
+    ]
+
+
+def evaluate_frame(scene, depsgraph=None):
+    """
+    Evaluates every rig for the scene's current frame and writes the Empties.
+    Without a depsgraph, only rigs whose lights can be read from F-Curves
+    are evaluated; with one, only the rest are (see above).
+    Returns how many rigs were evaluated.
+    """
+    if not bpy.types.Scene.is_evaluating_shading_rig:
+        return 0
+
+    frame = scene.frame_current + scene.frame_subframe
+    rigs = []
+    light_rotations = []
+    light_positions = []
+    light_transforms = {}
+    for rig_item in get_render_rigs(scene):
+        light_obj = rig_item.light_object
+        light_obj_key = light_obj.name_full
+        if light_obj_key not in light_transforms:
+            from_fcurves = bake_helpers.can_read_fcurves_directly(light_obj)
+            if from_fcurves == (depsgraph is not None):
+                # The other pass handles this light
+                light_transforms[light_obj_key] = None
+            elif depsgraph is None:
+                rotations, locations = bake_helpers.sample_light_from_fcurves(
+                    light_obj, [frame]
+                )
+                light_transforms[light_obj_key] = (rotations[0], locations[0])
+            else:
+                eval_light_obj = light_obj.evaluated_get(depsgraph)
+                light_transforms[light_obj_key] = (
+                    np.array(eval_light_obj.rotation_euler),
+                    np.array(eval_light_obj.location),
+                )
+
+        light_transform = light_transforms[light_obj_key]
+        if light_transform is None:
+            continue
+        rigs.append(rig_item)
+        light_rotations.append(light_transform[0])
+        light_positions.append(light_transform[1])
+
+    if not rigs:
+        return 0
+
+    weighted_positions, weighted_scales, weighted_rotations = (
+        sr_link_cache.evaluate_rigs(rigs, light_rotations, light_positions)
+    )
+    written_count = sr_live_update.write_results(
+        [
+            (
+                rig_item.empty_object,
+                (
+                    tuple(weighted_positions[i]),
+                    tuple(weighted_scales[i]),
+                    tuple(weighted_rotations[i]),
+                ),
+            )
+            for i, rig_item in enumerate(rigs)
+        ]
+    )
+    if depsgraph is not None and written_count:
+        # This frame's depsgraph has already been evaluated with the old
+        # Empties, re-evaluate it before anything renders from it
+        for rig_item in rigs:
+            rig_item.empty_object.update_tag(refresh={"OBJECT"})
+        depsgraph.update()
+    return len(rigs)
+
+
+@persistent
+def render_init_handler(scene, *args):
+    global _rendering, _evaluated_frame
+    _rendering = True
+    _evaluated_frame = None
+    # A farm render can enable the addon after the file has loaded, so
+    # load_post never rebuilt the parameter images
+    sr_packing.rebuild_param_textures()
+
+
+@persistent
+def render_finished_handler(scene, *args):
+    global _rendering
+    _rendering = False
+
+
+@persistent
+def frame_change_pre_handler(scene, *args):
+    global _evaluated_frame
+    if should_evaluate():
+        evaluate_frame(scene)
+        _evaluated_frame = (scene.name, scene.frame_current + scene.frame_subframe)
+
+
+@persistent
+def frame_change_post_handler(scene, depsgraph=None):
+    if should_evaluate() and depsgraph is not None:
+        evaluate_frame(scene, depsgraph)
+
+
+@persistent
+def render_pre_handler(scene, *args):
+    # Still renders (F12, -f) don't always go through a frame change
+    if _evaluated_frame != (scene.name, scene.frame_current + scene.frame_subframe):
+        evaluate_frame(scene)
+
+
+HANDLERS = (
+    ("render_init", render_init_handler),
+    ("render_complete", render_finished_handler),
+    ("render_cancel", render_finished_handler),
+    ("frame_change_pre", frame_change_pre_handler),
+    ("frame_change_post", frame_change_post_handler),
+    ("render_pre", render_pre_handler),
+)
+
+
+def register_handlers():
+    for handler_name, handler in HANDLERS:
+        handler_list = getattr(bpy.app.handlers, handler_name)
+        if handler not in handler_list:
+            handler_list.append(handler)
+
+
+def unregister_handlers():
+    global _rendering
+    _rendering = False
+    for handler_name, handler in HANDLERS:
+        handler_list = getattr(bpy.app.handlers, handler_name)
+        if handler in handler_list:
+            handler_list.remove(handler)
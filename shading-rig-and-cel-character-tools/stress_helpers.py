@@ -0,0 +1,329 @@
+import json
+import math
+import random
+import time
+
+import bpy
+from bpy.props import IntProperty, StringProperty
+from bpy.types import (
+    Operator,
+)
+from mathutils import Euler, Vector
+
+from . import json_helpers, sr_link_cache, sr_live_update, sr_profiler
+
+# ---------------------------------------------------------------------------- #
+#                           Synthetic stress scenes                            #
+# ---------------------------------------------------------------------------- #
+
+# Builds characters x effects x links x objects in an empty file, the same way
+# an artist would (the Add Effect and Add Effect to Material operators, so
+# properties objects, drivers and material chains are all real), then times
+# the operations that get slow as scenes grow. The same seed always builds
+# the same scene, so timings can be compared before and after a change.
+
+STRESS_CHARACTER_PREFIX = "Stress"
+EVALUATION_PASSES = 20
+JSON_SYNC_PASSES = 20
+
+
+def get_stress_character_name(character_index):
+    return f"{STRESS_CHARACTER_PREFIX}{character_index:02d}"
+
+
+def random_euler(rng):
+    return Euler(
+        (
+            rng.uniform(-math.pi, math.pi),
+            rng.uniform(-math.pi / 2, math.pi / 2),
+            rng.uniform(-math.pi, math.pi),
+        )
+    )
+
+
+def random_offset(rng, length):
+    """A random direction, length long (Add Effect to Material wants 0.25-2)."""
+    direction = Vector(
+        (rng.gauss(0.0, 1.0), rng.gauss(0.0, 1.0), rng.gauss(0.0, 1.0))
+    )
+    if direction.length < 1e-6:
+        direction = Vector((1.0, 0.0, 0.0))
+    return direction.normalized() * length
+
+
+def create_character_objects(context, character_index, object_count, rng):
+    """
+    A light, a material copied from ShadingRig_Base and object_count meshes
+    sharing one mesh (and so the material). Returns (meshes, light, material).
+    """
+    character_name = get_stress_character_name(character_index)
+    collection = context.collection
+    origin = Vector((character_index * 10.0, 0.0, 0.0))
+
+    material = bpy.data.materials["ShadingRig_Base"].copy()
+    material.name = f"ShadingRig_{character_name}"
+
+    mesh = bpy.data.meshes.new(f"{character_name}_Mesh")
+    mesh.from_pydata(
+        [(x, y, z) for x in (-0.2, 0.2) for y in (-0.2, 0.2) for z in (-0.2, 0.2)],
+        [],
+        [
+            (0, 1, 3, 2),
+            (4, 6, 7, 5),
+            (0, 4, 5, 1),
+            (2, 3, 7, 6),
+            (0, 2, 6, 4),
+            (1, 5, 7, 3),
+        ],
+    )
+    mesh.materials.append(material)
+
+    meshes = []
+    for object_index in range(object_count):
+        obj = bpy.data.objects.new(f"{character_name}_Object_{object_index:03d}", mesh)
+        obj.location = origin + Vector(
+            (rng.uniform(-3.0, 3.0), rng.uniform(-3.0, 3.0), rng.uniform(0.0, 3.0))
+        )
+        collection.objects.link(obj)
+        meshes.append(obj)
+
+    light_data = bpy.data.lights.new(f"{character_name}_Key", type="SUN")
+    light = bpy.data.objects.new(f"{character_name}_Key", light_data)
+    light.location = origin + Vector((0.0, 0.0, 5.0))
+    light.rotation_euler = random_euler(rng)
+    collection.objects.link(light)
+
+    return meshes, light, material
+
+
+def add_random_links(rig_item, link_count, rng):
+    """Same as Add Link, without moving the light and Empty around first."""
+    light_position = rig_item.light_object.location.copy()
+    empty_position = rig_item.empty_object.location.copy()
+    for link_index in range(link_count):
+        new_corr = rig_item.links.add()
+        new_corr.name = f"Link_{rig_item.name}_{link_index + 1:03d}"
+        new_corr.light_rotation = random_euler(rng)
+        new_corr.light_position = light_position + random_offset(rng, rng.uniform(0.0, 1.0))
+        new_corr.empty_position = empty_position + random_offset(rng, rng.uniform(0.0, 0.3))
+        new_corr.empty_scale = [rng.uniform(0.5, 1.5) for _ in range(3)]
+        new_corr.empty_rotation = random_euler(rng)
+    sr_link_cache.invalidate(rig_item)
+
+
+def randomize_effect(rig_item, rng):
+    # Written as ID properties so the update callbacks don't sync the whole
+    # list to JSON once per value
+    rig_item["elongation"] = rng.uniform(0.0, 1.0)
+    rig_item["sharpness"] = rng.uniform(0.0, 1.0)
+    rig_item["hardness"] = rng.uniform(0.0, 1.0)
+    rig_item["bulge"] = rng.uniform(-1.0, 1.0)
+    rig_item["bend"] = rng.uniform(-1.0, 1.0)
+    rig_item["rotation"] = rng.randint(0, 99)
+
+
+def time_call(timings, key, function, *args, **kwargs):
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    timings.setdefault(key, []).append((time.perf_counter() - start) * 1000.0)
+    return result
+
+
+def generate_stress_scene(context, seed, characters, effects, links, objects):
+    """
+    Builds the scene and returns {operation: [milliseconds, ...]} for adding
+    effects and adding them to materials.
+    """
+    rng = random.Random(seed)
+    scene = context.scene
+    timings = {}
+
+    for character_index in range(characters):
+        # Setting the name creates the character's properties object
+        scene.shading_rig_chararacter_name = get_stress_character_name(character_index)
+        if "ShadingRigEffect" not in bpy.data.node_groups:
+            bpy.ops.shading_rig.append_nodes()
+
+        meshes, light, material = create_character_objects(
+            context, character_index, objects, rng
+        )
+        scene.shading_rig_default_material = material
+        scene.shading_rig_default_light = light
+        first_rig_index = len(scene.shading_rig_list)
+
+        for _ in range(effects):
+            target = meshes[rng.randrange(len(meshes))]
+            scene.cursor.location = target.location + random_offset(
+                rng, rng.uniform(0.5, 1.5)
+            )
+            time_call(timings, "add_effect", bpy.ops.shading_rig.list_add)
+
+            # Add Effect to Material works on (and measures from) the active object
+            context.view_layer.objects.active = target
+            time_call(
+                timings,
+                "add_to_material",
+                bpy.ops.shading_rig.add_effect_coordinates_node,
+            )
+
+            rig_item = scene.shading_rig_list[len(scene.shading_rig_list) - 1]
+            randomize_effect(rig_item, rng)
+            add_random_links(rig_item, links, rng)
+
+        # Each character's properties object only holds its own effects
+        props_obj = json_helpers.get_scene_properties_object()
+        props_obj["shading_rig_list_json"] = json_helpers.serialize_rig_list_to_json(
+            scene.shading_rig_list[first_rig_index:]
+        )
+
+    if characters > 1:
+        json_helpers.create_combined_properties_object()
+        json_helpers.invalidate_scene_properties_cache()
+
+    return timings
+
+
+def evaluate_live_rigs_now(scene, depsgraph, addon_prefs):
+    """
+    One live evaluation, including the blending deferred mode would leave
+    to its timer, so the timing is the whole cost either way.
+    """
+    sr_live_update.evaluate_live_rigs(scene, depsgraph, addon_prefs)
+    sr_live_update.flush_dirty_rigs(addon_prefs)
+
+
+def run_stress_benchmarks(context, seed, timings=None):
+    """
+    Times live evaluation with every light moved, and syncing every effect to
+    JSON. Adds them to timings and returns it.
+    """
+    rng = random.Random(seed)
+    scene = context.scene
+    addon_prefs = context.preferences.addons["shading-rig-and-cel-character-tools"].preferences
+    timings = timings if timings is not None else {}
+
+    lights = {
+        rig_item.light_object
+        for rig_item in scene.shading_rig_list
+        if rig_item.light_object
+    }
+    for _ in range(EVALUATION_PASSES):
+        for light in lights:
+            light.rotation_euler = random_euler(rng)
+        context.view_layer.update()
+        depsgraph = context.evaluated_depsgraph_get()
+        # Outside a handler depsgraph.updates is empty, so make every light count
+        sr_live_update.clear_light_transforms()
+        time_call(
+            timings,
+            "handler_evaluation",
+            evaluate_live_rigs_now,
+            scene,
+            depsgraph,
+            addon_prefs,
+        )
+
+    for _ in range(JSON_SYNC_PASSES):
+        time_call(timings, "json_sync", json_helpers.sync_scene_to_json, scene)
+
+    return timings
+
+
+def get_stress_report(settings, timings):
+    return {
+        "settings": settings,
+        "blender_version": bpy.app.version_string,
+        "timings": {
+            operation: sr_profiler.summarize(durations)
+            for operation, durations in timings.items()
+        },
+    }
+
+
+class SR_OT_GenerateStressScene(Operator):
+    """Build a synthetic shading rig scene and time it."""
+
+    bl_idname = "shading_rig.generate_stress_scene"
+    bl_label = "Generate Stress Scene"
+    bl_description = (
+        "Build characters, effects, links and objects from a seed in this empty "
+        "file, then time adding effects, adding them to materials, live "
+        "evaluation and JSON sync"
+    )
+    bl_options = {"REGISTER", "UNDO"}
+
+    seed: IntProperty(name="Seed", default=0, min=0)
+    characters: IntProperty(name="Characters", default=2, min=1, soft_max=16)
+    effects: IntProperty(
+        name="Effects per Character", default=8, min=1, soft_max=64
+    )
+    links: IntProperty(name="Links per Effect", default=16, min=1, soft_max=256)
+    objects: IntProperty(
+        name="Objects per Character",
+        description="Objects sharing each character's material",
+        default=4,
+        min=1,
+        soft_max=256,
+    )
+    output: StringProperty(
+        name="Output",
+        description="Optional JSON file to save the timings to",
+        subtype="FILE_PATH",
+    )
+
+    @classmethod
+    def poll(cls, context):
+        if len(context.scene.shading_rig_list) > 0 or any(
+            obj.name.startswith("ShadingRigSceneProperties_") for obj in bpy.data.objects
+        ):
+            cls.poll_message_set("Run this in an empty file.")
+            return False
+        return True
+
+    def invoke(self, context, event):
+        return context.window_manager.invoke_props_dialog(self)
+
+    def execute(self, context):
+        settings = {
+            "seed": self.seed,
+            "characters": self.characters,
+            "effects": self.effects,
+            "links": self.links,
+            "objects": self.objects,
+        }
+        try:
+            timings = generate_stress_scene(
+                context,
+                self.seed,
+                self.characters,
+                self.effects,
+                self.links,
+                self.objects,
+            )
+            run_stress_benchmarks(context, self.seed, timings)
+        except RuntimeError as e:
+            # A poll failed inside one of the operators
+            self.report({"ERROR"}, f"Failed to generate stress scene: {e}")
+            return {"CANCELLED"}
+
+        report = get_stress_report(settings, timings)
+        print(f"Shading Rig stress test: {json.dumps(report, indent=2)}")
+
+        if self.output:
+            filepath = bpy.path.abspath(self.output)
+            try:
+                with open(filepath, "w") as f:
+                    json.dump(report, f, indent=2)
+            except OSError as e:
+                self.report({"ERROR"}, f"Failed to save timings: {e}")
+                return {"CANCELLED"}
+
+        summary = ", ".join(
+            f"{operation} {timing['mean_ms']:.2f} ms"
+            for operation, timing in report["timings"].items()
+        )
+        self.report(
+            {"INFO"},
+            f"Generated {self.characters * self.effects} effects (mean: {summary}).",
+        )
+        return {"FINISHED"}
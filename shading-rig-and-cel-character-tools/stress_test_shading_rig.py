@@ -0,0 +1,62 @@
+"""
+Builds a synthetic shading rig scene from a seed and times it. Run it with
+Blender, not on its own:
+
+    blender -b --factory-startup --python stress_test_shading_rig.py -- --seed 1 --characters 4 --effects 16 --links 32 --objects 8 --output timings.json
+
+The same arguments always build the same scene, so the timings can be
+compared before and after a change.
+"""
+
+import argparse
+import sys
+
+import addon_utils
+import bpy
+
+ADDON_NAME = "shading-rig-and-cel-character-tools"
+
+
+def parse_args():
+    argv = sys.argv[sys.argv.index("--") + 1 :] if "--" in sys.argv else []
+    parser = argparse.ArgumentParser(
+        description="Build a seeded shading rig stress scene and time it"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--characters", type=int, default=2)
+    parser.add_argument("--effects", type=int, default=8, help="Effects per character")
+    parser.add_argument("--links", type=int, default=16, help="Links per effect")
+    parser.add_argument(
+        "--objects", type=int, default=4, help="Objects sharing each character's material"
+    )
+    parser.add_argument("--output", default="", help="JSON file to save the timings to")
+    parser.add_argument("--save", help="Also save the generated scene as this .blend")
+    return parser.parse_args(argv)
+
+
+def main():
+    args = parse_args()
+
+    _, loaded = addon_utils.check(ADDON_NAME)
+    if not loaded:
+        if not addon_utils.enable(ADDON_NAME, default_set=False, persistent=True):
+            print(f"Shading Rig: could not enable the '{ADDON_NAME}' addon")
+            sys.exit(1)
+
+    result = bpy.ops.shading_rig.generate_stress_scene(
+        seed=args.seed,
+        characters=args.characters,
+        effects=args.effects,
+        links=args.links,
+        objects=args.objects,
+        output=args.output,
+    )
+    if result != {"FINISHED"}:
+        sys.exit(1)
+
+    if args.save:
+        bpy.ops.wm.save_as_mainfile(filepath=args.save)
+
+
+if __name__ == "__main__":
+    main()
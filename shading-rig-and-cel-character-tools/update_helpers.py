@@ -1,13 +1,36 @@
-from . import json_helpers, sr_presets
+from . import json_helpers, sr_link_cache, sr_packing, sr_presets
 import bpy
 
 def property_update_sync(self, context):
     """
     Generic update callback for rig item properties.
-    Triggers a sync to the JSON data store.
+    Triggers a sync to the JSON data store, and in Push packing mode writes
+    the new packed values to the objects.
     """
+    if sr_packing.use_push_packing(context.scene):
+        sr_packing.push_packed_values([self])
     json_helpers.sync_scene_to_json(context.scene)
 
+def interpolation_update_sync(self, context):
+    """
+    Update callback for properties that change how links are blended.
+    Cached results are no longer valid, and the rig needs re-evaluating.
+    """
+    sr_link_cache.invalidate(self)
+    json_helpers.sync_scene_to_json(context.scene)
+
+def update_light_object(self, context):
+    """
+    Update callback for the rig's light. The rig is now bound to a different
+    light, so it needs re-evaluating and the light index needs rebuilding.
+    """
+    sr_link_cache.invalidate(self)
+    json_helpers.sync_scene_to_json(context.scene)
+
+def update_packing_mode(self, context):
+    """Swaps every effect between drivers and pushed values."""
+    sr_packing.apply_packing_mode(self)
+
 def apply_preset(rig_item, preset_identifier):
     """Applies a preset's values to a given rig item."""
     if preset_identifier not in sr_presets.PRESETS:
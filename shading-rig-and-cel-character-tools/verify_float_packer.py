@@ -0,0 +1,291 @@
+"""
+Checks Hansen's float packing against the shader's decode, and times it.
+Runs with plain Python and NumPy, no Blender needed:
+
+    python verify_float_packer.py [--samples 100000] [--output report.json]
+
+The three channels don't share any digits except rotation's, so every
+channel is swept over its whole grid of inputs (every 3 digit value of every
+field packed into it) instead of every combination of all eight fields.
+Inputs are float32, like the rig item's properties the drivers read, and
+the decode is unpack_many's float32 copy of the node chain.
+
+Exits with 1 if pack_many and packing_algorithm disagree, or any field
+decodes further from what was set than the format's resolution.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.realpath(__file__)))
+import hansens_float_packer  # noqa: E402
+
+# Largest error allowed per decoded field. The 3 digit fields are floored to
+# 0.001 steps, rotation decodes as rotation / 10, mode and clamp are exact.
+FIELD_TOLERANCES = {
+    "elongation": 0.001,
+    "sharpness": 0.001,
+    "rotation": 1e-5,
+    "bend": 0.001,
+    "bulge": 0.001,
+    "hardness": 0.001,
+    "mode": 0.0,
+    "clamp": 0.0,
+}
+# float32 can't hold most 0.001 steps exactly, allow for that on top
+FLOAT32_SLACK = 1e-6
+
+# The smallest change each field can show after decoding
+FIELD_STEPS = {
+    "elongation": 0.001,
+    "sharpness": 0.001,
+    "rotation": 0.1,
+    "bend": 0.001,
+    "bulge": 0.001,
+    "hardness": 0.001,
+    "mode": 1.0,
+    "clamp": 1.0,
+}
+
+# Which fields each sweep exercises
+SWEEP_FIELDS = {
+    "red": ("elongation", "sharpness", "rotation"),
+    "green": ("bend", "hardness"),
+    "blue": ("bulge", "mode", "clamp", "rotation"),
+}
+
+CHUNK_SIZE = 1 << 20
+
+
+def property_values(low, high):
+    """Every 3 digit value from low to high, as the float32 a FloatProperty holds."""
+    steps = np.arange(round(low * 1000), round(high * 1000) + 1)
+    return (steps / 1000.0).astype(np.float32).astype(np.float64)
+
+
+def get_sweep(channel):
+    """
+    The grid for one channel as {field: values along that axis}; the
+    fields not in it stay at 0.
+    """
+    if channel == "red":
+        return {
+            "elongation": property_values(0.0, 0.999),
+            # The tens digit lives in red, the blue sweep does the ones
+            "rotation": np.arange(0, 100, 10, dtype=np.float64),
+            "sharpness": property_values(0.0, 0.999),
+        }
+    if channel == "green":
+        return {
+            "bend": property_values(-0.999, 0.999),
+            "hardness": property_values(0.0, 0.999),
+        }
+    return {
+        "bulge": property_values(-0.999, 0.999),
+        "mode": np.arange(5, dtype=np.float64),
+        "clamp": np.array([0.0, 1.0]),
+        "rotation": np.arange(100, dtype=np.float64),
+    }
+
+
+def iterate_grid(axes, chunk_size=CHUNK_SIZE):
+    """Yields {field: values} chunks covering every combination of the axes."""
+    names = list(axes)
+    shape = tuple(len(axes[name]) for name in names)
+    total = int(np.prod(shape))
+    for start in range(0, total, chunk_size):
+        flat = np.arange(start, min(start + chunk_size, total))
+        indices = np.unravel_index(flat, shape)
+        yield {name: axes[name][index] for name, index in zip(names, indices)}
+
+
+def get_expected(fields):
+    """What each field should decode to, given what was set."""
+    return {
+        "elongation": fields["elongation"],
+        "sharpness": fields["sharpness"],
+        "rotation": fields["rotation"] / 10.0,
+        "bend": fields["bend"],
+        "bulge": fields["bulge"],
+        "hardness": fields["hardness"],
+        "mode": fields["mode"],
+        "clamp": fields["clamp"],
+    }
+
+
+def pack_fields(fields):
+    return hansens_float_packer.pack_many(
+        fields["elongation"],
+        fields["sharpness"],
+        fields["bulge"],
+        fields["bend"],
+        fields["hardness"],
+        fields["mode"],
+        fields["clamp"],
+        fields["rotation"],
+    )
+
+
+def verify_round_trip():
+    """
+    Sweeps every channel through pack_many and the float32 decode.
+    Returns {field: {"max_error", "worst_input", "steps_lost", "checked"}},
+    steps_lost counting the inputs that decode to a different step than the
+    one that was set.
+    """
+    results = {}
+    for channel, checked_fields in SWEEP_FIELDS.items():
+        axes = get_sweep(channel)
+        for chunk in iterate_grid(axes):
+            count = len(next(iter(chunk.values())))
+            fields = {field: np.zeros(count) for field in FIELD_TOLERANCES}
+            fields.update(chunk)
+
+            decoded = hansens_float_packer.unpack_many(pack_fields(fields))
+            expected = get_expected(fields)
+            for field in checked_fields:
+                decoded_field = decoded[field].astype(np.float64)
+                errors = np.abs(decoded_field - expected[field])
+                worst = int(np.argmax(errors))
+                result = results.setdefault(
+                    field,
+                    {"max_error": 0.0, "worst_input": None, "steps_lost": 0, "checked": 0},
+                )
+                step = FIELD_STEPS[field]
+                result["steps_lost"] += int(
+                    np.count_nonzero(
+                        np.round(decoded_field / step) != np.round(expected[field] / step)
+                    )
+                )
+                result["checked"] += count
+                if errors[worst] > result["max_error"] or result["worst_input"] is None:
+                    result["max_error"] = float(errors[worst])
+                    result["worst_input"] = {
+                        name: float(values[worst]) for name, values in fields.items()
+                    }
+    return results
+
+
+def random_fields(rng, count):
+    """Random effect states, partly out of range, as the drivers could see them."""
+    return {
+        "elongation": rng.uniform(-0.1, 1.1, count),
+        "sharpness": rng.uniform(-0.1, 1.1, count),
+        "bulge": rng.uniform(-1.1, 1.1, count),
+        "bend": rng.uniform(-1.1, 1.1, count),
+        "hardness": rng.uniform(-0.1, 1.1, count),
+        "mode": rng.integers(0, 5, count).astype(np.float64),
+        "clamp": rng.integers(0, 2, count).astype(np.float64),
+        "rotation": rng.integers(0, 100, count).astype(np.float64),
+    }
+
+
+def call_packing_algorithm(fields, i):
+    return hansens_float_packer.packing_algorithm(
+        fields["elongation"][i],
+        fields["sharpness"][i],
+        fields["bulge"][i],
+        fields["bend"][i],
+        fields["hardness"][i],
+        int(fields["mode"][i]),
+        bool(fields["clamp"][i]),
+        int(fields["rotation"][i]),
+    )
+
+
+def verify_pack_many(fields):
+    """How many of the states pack_many packs differently to packing_algorithm."""
+    expected = np.array(
+        [call_packing_algorithm(fields, i) for i in range(len(fields["mode"]))],
+        dtype=np.float64,
+    )
+    return int(np.count_nonzero(np.any(pack_fields(fields) != expected, axis=1)))
+
+
+def measure_throughput(fields):
+    """Packs (or decodes) per second for each path."""
+    count = len(fields["mode"])
+    throughput = {}
+
+    # Per effect- the drivers call it once per channel, so three times that
+    start = time.perf_counter()
+    for i in range(count):
+        call_packing_algorithm(fields, i)
+    throughput["packing_algorithm"] = count / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    packed = pack_fields(fields)
+    throughput["pack_many"] = count / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    hansens_float_packer.unpack_many(packed)
+    throughput["unpack_many"] = count / (time.perf_counter() - start)
+    return throughput
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Verify Hansen's float packing against the shader decode"
+    )
+    parser.add_argument(
+        "--samples",
+        type=int,
+        default=100000,
+        help="Random states compared with packing_algorithm and timed",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="JSON file to save the report to")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    fields = random_fields(np.random.default_rng(args.seed), args.samples)
+
+    round_trip = verify_round_trip()
+    mismatches = verify_pack_many(fields)
+    throughput = measure_throughput(fields)
+
+    failed = mismatches > 0
+    print(f"pack_many vs packing_algorithm: {mismatches} of {args.samples} differ")
+    print(
+        f"{'field':<12}{'max error':>14}{'tolerance':>12}{'steps lost':>12}{'checked':>12}"
+    )
+    for field, tolerance in FIELD_TOLERANCES.items():
+        result = round_trip[field]
+        passed = result["max_error"] <= tolerance + FLOAT32_SLACK
+        failed = failed or not passed
+        print(
+            f"{field:<12}{result['max_error']:>14.8f}{tolerance:>12g}"
+            f"{result['steps_lost']:>12}{result['checked']:>12}  "
+            f"{'ok' if passed else 'FAIL'}"
+        )
+        if not passed:
+            print(f"{'':<12}worst at {result['worst_input']}")
+    for path, per_second in throughput.items():
+        print(f"{path:<18}{per_second:>16,.0f} per second")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(
+                {
+                    "pack_many_mismatches": mismatches,
+                    "samples": args.samples,
+                    "round_trip": round_trip,
+                    "tolerances": FIELD_TOLERANCES,
+                    "throughput_per_second": throughput,
+                },
+                f,
+                indent=2,
+            )
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()